@@ -0,0 +1,81 @@
+"""Benchmark of function inlining on the sorting programs.
+
+Compiles each sorting program (the sorting example and the sorting
+benchmark programs) at every optimization level and reports the best
+VM run time, the instructions and calls executed, and the speedup over
+level 0. Output is checked against level 0's.
+
+Usage: python3 benchmarks/inlining.py [PROGRAM ...] [--runs RUNS]
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import argparse
+import gc
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'bin'))
+
+from mpl.mypl_compiler import compile
+from mpl.mypl_inliner import INLINE_SIZES
+
+PROGRAMS = [
+    os.path.join(ROOT, 'examples', 'proj-8-sorting.mypl'),
+    os.path.join(ROOT, 'benchmarks', 'programs', 'selection_sort.mypl'),
+    os.path.join(ROOT, 'benchmarks', 'programs', 'merge_sort.mypl'),
+    os.path.join(ROOT, 'benchmarks', 'programs', 'swap_sort.mypl'),
+]
+
+
+def time_level(source, level, runs):
+    """Returns the best run time (in seconds) of a program compiled at
+    an optimization level, with the output and metrics of its last run.
+
+    """
+    program = compile(source, opt_level=level)
+    best = None
+    for _ in range(runs):
+        vm = program.vm(io.StringIO(''), io.StringIO())
+        gc.collect()
+        start = time.perf_counter()
+        vm.run()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, vm.stdout.getvalue(), vm.metrics()
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='mypl inlining benchmark')
+    argparser.add_argument('programs', nargs='*',
+                           help='mypl files to run (default: the sorting programs)')
+    argparser.add_argument('--runs', type=int, default=5,
+                           help='runs per program and level (the best time is used)')
+    args = argparser.parse_args()
+
+    print(f'{"program":22} {"level":>5} {"ms":>9} {"instrs":>10} {"calls":>8} {"speedup":>8}')
+    failed = False
+    for path in args.programs or PROGRAMS:
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        name = os.path.splitext(os.path.basename(path))[0]
+        base_seconds = base_output = None
+        for level in sorted(INLINE_SIZES):
+            seconds, output, metrics = time_level(source, level, args.runs)
+            if base_seconds is None:
+                base_seconds, base_output = seconds, output
+            flag = '' if output == base_output else '  WRONG OUTPUT'
+            failed = failed or bool(flag)
+            print(f'{name:22} {level:5} {seconds * 1000:9.2f} {metrics["instructions"]:10} '
+                  f'{metrics["calls"]:8} {base_seconds / seconds:7.2f}x{flag}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
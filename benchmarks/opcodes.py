@@ -0,0 +1,176 @@
+"""Per-opcode micro-benchmarks for the mypl VM.
+
+Each benchmark is a hand-assembled frame template that runs a short,
+stack-neutral instruction sequence (unrolled several times) inside a
+counted loop, so the VM run loop is measured without the front end.
+The time of the same loop with an empty body is subtracted, and the
+rest is reported in nanoseconds per instruction of the sequence and
+per sequence.
+
+Usage: python3 benchmarks/opcodes.py [FAMILY ...] [-n ITERATIONS]
+           [--unroll N] [--runs RUNS]
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'bin'))
+
+from mpl.mypl_frame import *
+from mpl.mypl_vm import VM
+
+# variable slots set up before the loop
+COUNTER, INT_A, INT_B, STRUCT, ARRAY, BOOL = range(6)
+
+PROLOGUE = [
+    PUSH(0), STORE(COUNTER),
+    PUSH(7), STORE(INT_A),
+    PUSH(3), STORE(INT_B),
+    ALLOCS(), DUP(), PUSH(5), SETF('x'), STORE(STRUCT),
+    PUSH(8), ALLOCA(), STORE(ARRAY),
+    PUSH(True), STORE(BOOL),
+]
+
+# family -> [(name, sequence)]; each sequence leaves the stack as it
+# found it
+BENCHMARKS = {
+    'stack': [
+        ('PUSH/POP', [PUSH(1), POP()]),
+        ('DUP', [PUSH(1), DUP(), POP(), POP()]),
+        ('NOP', [NOP()]),
+    ],
+    'variables': [
+        ('LOAD/STORE', [LOAD(INT_A), STORE(INT_A)]),
+    ],
+    'arithmetic': [
+        ('ADD', [LOAD(INT_A), LOAD(INT_B), ADD(), POP()]),
+        ('SUB', [LOAD(INT_A), LOAD(INT_B), SUB(), POP()]),
+        ('MUL', [LOAD(INT_A), LOAD(INT_B), MUL(), POP()]),
+        ('DIV', [LOAD(INT_A), LOAD(INT_B), DIV(), POP()]),
+    ],
+    'logic': [
+        ('AND', [LOAD(BOOL), LOAD(BOOL), AND(), POP()]),
+        ('OR', [LOAD(BOOL), LOAD(BOOL), OR(), POP()]),
+        ('NOT', [LOAD(BOOL), NOT(), POP()]),
+    ],
+    'comparison': [
+        ('CMPLT', [LOAD(INT_A), LOAD(INT_B), CMPLT(), POP()]),
+        ('CMPLE', [LOAD(INT_A), LOAD(INT_B), CMPLE(), POP()]),
+        ('CMPEQ', [LOAD(INT_A), LOAD(INT_B), CMPEQ(), POP()]),
+        ('CMPNE', [LOAD(INT_A), LOAD(INT_B), CMPNE(), POP()]),
+    ],
+    'branch': [
+        # jump targets are relative to the sequence (fixed up by assemble)
+        ('JMP', [JMP(1)]),
+        ('JMPF (not taken)', [LOAD(BOOL), JMPF(2)]),
+    ],
+    'fields': [
+        ('GETF', [LOAD(STRUCT), GETF('x'), POP()]),
+        ('SETF', [LOAD(STRUCT), LOAD(INT_A), SETF('x')]),
+    ],
+    'indexing': [
+        ('GETI', [LOAD(ARRAY), PUSH(3), GETI(), POP()]),
+        ('SETI', [LOAD(ARRAY), PUSH(3), LOAD(INT_A), SETI()]),
+    ],
+    'calls': [
+        ('CALL/RET', [LOAD(INT_A), CALL('identity'), POP()]),
+    ],
+    'allocation': [
+        ('ALLOCS', [ALLOCS(), POP()]),
+        ('ALLOCA', [PUSH(4), ALLOCA(), POP()]),
+    ],
+}
+
+# the function called by the CALL/RET benchmark
+IDENTITY = VMFrameTemplate('identity', 1, [STORE(0), LOAD(0), RET()])
+
+
+def assemble(sequence, iterations, unroll):
+    """Returns a main frame template that runs sequence unroll times in
+    a loop of the given number of iterations.
+
+    """
+    instrs = list(PROLOGUE)
+    top = len(instrs)
+    instrs += [LOAD(COUNTER), PUSH(iterations), CMPLT()]
+    exit_jump = JMPF(None)
+    instrs.append(exit_jump)
+    for _ in range(unroll):
+        start = len(instrs)
+        for instr in sequence:
+            operand = instr.operand
+            if instr.opcode in (OpCode.JMP, OpCode.JMPF):
+                operand = start + operand
+            instrs.append(VMInstr(instr.opcode, operand))
+    instrs += [LOAD(COUNTER), PUSH(1), ADD(), STORE(COUNTER), JMP(top)]
+    exit_jump.operand = len(instrs)
+    instrs += [PUSH(None), RET()]
+    return VMFrameTemplate('main', 0, instrs)
+
+
+def run_time(template):
+    """Returns the time (in seconds) of one run of a main frame template."""
+    vm = VM(stdout=io.StringIO())
+    vm.frame_templates = {'main': template, 'identity': IDENTITY}
+    start = time.perf_counter()
+    vm.run()
+    return time.perf_counter() - start
+
+
+def time_sequence(sequence, iterations, unroll, runs):
+    """Returns the best time (in seconds) over runs runs of the sequence's
+    loop, less the best time of the same loop with no body. The two are
+    run alternately so that both see the same machine conditions.
+
+    """
+    loop = assemble(sequence, iterations, unroll)
+    empty = assemble([], iterations, 0)
+    loop_times = []
+    empty_times = []
+    for _ in range(runs):
+        loop_times.append(run_time(loop))
+        empty_times.append(run_time(empty))
+    return min(loop_times) - min(empty_times)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='mypl VM opcode micro-benchmarks')
+    argparser.add_argument('families', nargs='*',
+                           help=f'families to run: {", ".join(BENCHMARKS)} (default: all)')
+    argparser.add_argument('-n', '--iterations', type=int, default=20000,
+                           help='loop iterations per run')
+    argparser.add_argument('--unroll', type=int, default=10,
+                           help='copies of the sequence per iteration')
+    argparser.add_argument('--runs', type=int, default=7,
+                           help='runs per benchmark (the best time is used)')
+    args = argparser.parse_args()
+    for family in args.families:
+        if family not in BENCHMARKS:
+            argparser.error(f'unknown family {family!r}')
+
+    # warm up before the first measurement
+    run_time(assemble([NOP()], args.iterations, args.unroll))
+    empty = min(run_time(assemble([], args.iterations, 0)) for _ in range(args.runs))
+    print(f'empty loop: {empty / args.iterations * 1e9:.0f} ns per iteration')
+    print()
+    print(f'{"family":12} {"sequence":18} {"instrs":>6} {"ns/instr":>9} {"ns/seq":>9}')
+    for family in args.families or BENCHMARKS:
+        for name, sequence in BENCHMARKS[family]:
+            seconds = time_sequence(sequence, args.iterations, args.unroll, args.runs)
+            count = args.iterations * args.unroll
+            ns_per_seq = seconds / count * 1e9
+            print(f'{family:12} {name:18} {len(sequence):6} '
+                  f'{ns_per_seq / len(sequence):9.1f} {ns_per_seq:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Front-end scaling harness for mypl.
+
+Generates programs of growing size with stress_gen.py, one dimension
+at a time, and times lexing, parsing, checking, and code generation
+for each. For each phase the report gives the growth exponent k
+(time ~ size^k) estimated from the smallest and largest sizes, so a
+phase that grows faster than linearly (k well above 1) stands out.
+A size that fails (e.g., by exceeding the recursion limit) is
+reported instead of timed, and larger sizes of that dimension are
+skipped.
+
+Usage: python3 benchmarks/scaling.py [DIMENSION ...] [--steps N]
+           [--factor F] [--runs RUNS]
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import argparse
+import math
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'bin'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mpl.mypl_error import MyPLError
+from mpl.mypl_timings import PhaseTimings, compile_timed
+from stress_gen import generate
+
+PHASES = ['lex', 'parse', 'check', 'codegen']
+
+# dimension -> (smallest size, sizes of the other dimensions)
+DIMENSIONS = {
+    'functions': (100, {'overloads': 2, 'locals': 4, 'nesting': 2, 'terms': 4, 'fields': 4}),
+    'overloads': (1, {'functions': 50, 'locals': 4, 'nesting': 2, 'terms': 4, 'fields': 4}),
+    'locals': (50, {'functions': 10, 'overloads': 1, 'nesting': 2, 'terms': 4, 'fields': 4}),
+    'nesting': (25, {'functions': 10, 'overloads': 1, 'locals': 4, 'terms': 4, 'fields': 4}),
+    'terms': (100, {'functions': 10, 'overloads': 1, 'locals': 4, 'nesting': 2, 'fields': 4}),
+    'fields': (100, {'functions': 10, 'overloads': 1, 'locals': 4, 'nesting': 2, 'terms': 4}),
+}
+
+
+def time_phases(source, runs):
+    """Returns the best time (in seconds) of each front-end phase over
+    runs compiles of source.
+
+    """
+    best = {}
+    for _ in range(runs):
+        timings = PhaseTimings(memory=False)
+        compile_timed(source, timings)
+        for name, seconds, _ in timings.phases:
+            best[name] = min(best.get(name, seconds), seconds)
+    return best
+
+
+def scale(dimension, steps, factor, runs):
+    """Time the front end on programs growing along one dimension.
+
+    Returns: A list of (size, lines, phase times or an error message)
+    for each size tried.
+
+    """
+    size, others = DIMENSIONS[dimension]
+    rows = []
+    for _ in range(steps):
+        source = generate(**others, **{dimension: size})
+        lines = source.count('\n')
+        try:
+            rows.append((size, lines, time_phases(source, runs)))
+        except RecursionError:
+            rows.append((size, lines, 'recursion limit exceeded'))
+            break
+        except MyPLError as ex:
+            rows.append((size, lines, str(ex)))
+            break
+        size = int(size * factor)
+    return rows
+
+
+def exponent(rows, phase):
+    """Returns the growth exponent of a phase's time between the first
+    and last timed sizes, or None if it can't be estimated.
+
+    """
+    timed = [(size, times[phase]) for size, _, times in rows if isinstance(times, dict)]
+    if len(timed) < 2:
+        return None
+    (size0, time0), (size1, time1) = timed[0], timed[-1]
+    if time0 <= 0 or time1 <= 0:
+        return None
+    return math.log(time1 / time0) / math.log(size1 / size0)
+
+
+def print_report(dimension, rows):
+    print(f'{dimension:10} {"lines":>8} ' + ' '.join(f'{p + " ms":>11}' for p in PHASES))
+    for size, lines, times in rows:
+        if isinstance(times, dict):
+            print(f'{size:10} {lines:8} ' +
+                  ' '.join(f'{times[p] * 1000:11.1f}' for p in PHASES))
+        else:
+            print(f'{size:10} {lines:8} FAILED: {times}')
+    exponents = [exponent(rows, p) for p in PHASES]
+    print(f'{"exponent":19} ' + ' '.join(f'{k:11.2f}' if k is not None else f'{"-":>11}'
+                                         for k in exponents))
+    print()
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='mypl front-end scaling harness')
+    argparser.add_argument('dimensions', nargs='*',
+                           help=f'dimensions to grow: {", ".join(DIMENSIONS)} (default: all)')
+    argparser.add_argument('--steps', type=int, default=4,
+                           help='number of sizes per dimension')
+    argparser.add_argument('--factor', type=float, default=2.0,
+                           help='growth in size from one step to the next')
+    argparser.add_argument('--runs', type=int, default=1,
+                           help='compiles per size (the best time is used)')
+    args = argparser.parse_args()
+    for dimension in args.dimensions:
+        if dimension not in DIMENSIONS:
+            argparser.error(f'unknown dimension {dimension!r}')
+    for dimension in args.dimensions or DIMENSIONS:
+        print_report(dimension, scale(dimension, args.steps, args.factor, args.runs))
+
+
+if __name__ == '__main__':
+    main()
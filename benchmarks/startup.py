@@ -0,0 +1,94 @@
+"""Startup benchmark for the mypl entry point.
+
+Runs a hello-world program as a fresh process many times and reports
+the median wall time from launch to exit (the program executes only a
+handful of instructions, so this is effectively time-to-first-
+instruction), both with and without a warm compiled-program cache. A
+python -X importtime run breaks the import cost down by module.
+
+Usage: python3 benchmarks/startup.py [-n RUNS] [--top N]
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MYPL = os.path.join(ROOT, 'bin', 'mypl')
+HELLO = os.path.join(ROOT, 'examples', 'exec-1-hello.mypl')
+
+
+def time_process(cmd, runs, env=None):
+    """Returns the median wall time (in ms) of running cmd runs times."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, env=env, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def import_times(cmd, env=None):
+    """Returns (module, self us, cumulative us) for each import made by
+    cmd, as reported by python -X importtime.
+
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + cmd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            env=env, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def report_imports(label, rows, top):
+    """Print the total import time and the most expensive imports."""
+    # top-level imports are the ones that are not indented
+    total = sum(cum for module, _, cum in rows if not module.startswith('  '))
+    print(f'{label}: {total / 1000:.1f} ms importing {len(rows)} modules')
+    for module, _, cum in sorted(rows, key=lambda r: -r[2])[:top]:
+        print(f'    {cum / 1000:7.2f} ms  {module.strip()}')
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='mypl startup benchmark')
+    argparser.add_argument('-n', '--runs', type=int, default=20,
+                           help='number of launches per configuration')
+    argparser.add_argument('--top', type=int, default=8,
+                           help='number of slowest imports to list')
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold_env = dict(os.environ)
+        cold_env.pop('MYPL_CACHE_DIR', None)
+        warm_env = dict(os.environ, MYPL_CACHE_DIR=cache_dir)
+        cmd = [sys.executable, MYPL, HELLO]
+        # populate the cache before timing the warm runs
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, env=warm_env, check=True)
+
+        floor = time_process([sys.executable, '-c', 'pass'], args.runs)
+        cold = time_process(cmd, args.runs, cold_env)
+        warm = time_process(cmd, args.runs, warm_env)
+        print(f'python startup floor : {floor:7.1f} ms')
+        print(f'hello world (compile): {cold:7.1f} ms')
+        print(f'hello world (cached) : {warm:7.1f} ms')
+        print()
+        report_imports('compile', import_times([MYPL, HELLO], cold_env), args.top)
+        report_imports('cached', import_times([MYPL, HELLO], warm_env), args.top)
+
+
+if __name__ == '__main__':
+    main()
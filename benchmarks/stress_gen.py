@@ -0,0 +1,126 @@
+"""Generator for very large synthetic mypl programs.
+
+Builds a valid (and runnable) mypl program whose size along each
+dimension the front end has to cope with can be set on its own:
+
+    functions    number of function names
+    overloads    overloads of each function (differing in parameter type)
+    locals       local variables declared in each function
+    nesting      depth of the nested if/while blocks in each function
+    terms        number of terms in each long expression
+    fields       number of fields in the program's struct
+
+The default sizes give a program of about 100,000 lines.
+
+Usage: python3 benchmarks/stress_gen.py [--functions N] [--overloads N]
+           [--locals N] [--nesting N] [--terms N] [--fields N] [-o FILE]
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import argparse
+import sys
+
+# parameter types used for overloads, in order
+PARAM_TYPES = ['int', 'double', 'bool', 'string']
+
+# conversions of each parameter type's value a to an int
+TO_INT = {
+    'int': 'a',
+    'double': 'dtoi(a)',
+    'bool': '1',
+    'string': 'length(a)',
+}
+
+DEFAULTS = {
+    'functions': 1000,
+    'overloads': 3,
+    'locals': 8,
+    'nesting': 6,
+    'terms': 12,
+    'fields': 40,
+}
+
+
+def long_expr(names, terms):
+    """Returns an int expression of the given number of terms built from
+    the given variable names.
+
+    """
+    parts = [names[0]]
+    for i in range(1, terms):
+        op = '+' if i % 3 else '-'
+        parts.append(f'{op} {names[i % len(names)]}')
+    return ' '.join(parts)
+
+
+def function(name, param_type, locals, nesting, terms, fields):
+    """Returns the lines of one overload of a generated function."""
+    lines = [f'int {name}({param_type} a) {{']
+    names = [f'v{i}' for i in range(max(locals, 1))]
+    lines.append(f'  int v0 = {TO_INT[param_type]};')
+    for i in range(1, len(names)):
+        lines.append(f'  int v{i} = v{i - 1} + {i};')
+    lines.append(f'  Big s = new Big({", ".join(["0"] * fields)});')
+    # nested blocks, each with a local of its own
+    indent = '  '
+    for depth in range(nesting):
+        keyword = 'if' if depth % 2 == 0 else 'while'
+        lines.append(f'{indent}{keyword} (v0 < {depth + 1000}) {{')
+        indent += '  '
+        lines.append(f'{indent}int w{depth} = v0 + {depth};')
+        lines.append(f'{indent}s.f{depth % fields} = w{depth} + s.f{(depth * 7) % fields};')
+    lines.append(f'{indent}v0 = {long_expr(names, terms)};')
+    lines.append(f'{indent}v0 = v0 + 1000;')
+    for depth in reversed(range(nesting)):
+        indent = indent[:-2]
+        lines.append(f'{indent}}}')
+    lines.append(f'  return v0 + s.f{(len(name) * 13) % fields};')
+    lines.append('}')
+    return lines
+
+
+def generate(functions=1000, overloads=3, locals=8, nesting=6, terms=12, fields=40):
+    """Returns the text of a generated mypl program (see the module
+    docstring for the sizes).
+
+    """
+    fields = max(fields, 1)
+    lines = ['struct Big {']
+    lines += [f'  int f{i};' for i in range(fields)]
+    lines += ['}', '']
+    for f in range(functions):
+        for param_type in PARAM_TYPES[:overloads]:
+            lines += function(f'fun{f}', param_type, locals, nesting, terms, fields)
+            lines.append('')
+    args = {'int': '1', 'double': '1.5', 'bool': 'true', 'string': '"ab"'}
+    lines.append('void main() {')
+    lines.append('  int total = 0;')
+    for f in range(functions):
+        for param_type in PARAM_TYPES[:overloads]:
+            lines.append(f'  total = total + fun{f}({args[param_type]});')
+    lines.append('  print(total);')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='generate a large mypl program')
+    for name, default in DEFAULTS.items():
+        argparser.add_argument(f'--{name}', type=int, default=default,
+                               help=f'(default: {default})')
+    argparser.add_argument('-o', '--output', help='file to write (default: standard output)')
+    args = argparser.parse_args()
+    source = generate(**{name: getattr(args, name) for name in DEFAULTS})
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+
+
+if __name__ == '__main__':
+    main()
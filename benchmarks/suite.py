@@ -0,0 +1,274 @@
+"""Benchmark suite for the mypl interpreter.
+
+Runs each CPU-bound program in benchmarks/programs under every
+available engine, reporting the median and 95th percentile wall time
+and the instructions executed per second. The engines are:
+
+    vm      the program compiled once and run in-process (VM time only)
+    cli     a fresh bin/mypl process per run (startup, compile, and run)
+    server  a warm compile server, over its Unix domain socket
+
+Results can be saved as a baseline JSON file and later runs compared
+against it, flagging any median time that is slower than the baseline
+by more than a threshold (the exit status is then 1, for CI use).
+Baselines are machine specific, so compare on the machine that saved
+it.
+
+Usage: python3 benchmarks/suite.py [PROGRAM ...] [--engines vm,cli]
+           [--runs RUNS] [--baseline FILE] [--save-baseline]
+           [--threshold PERCENT] [--report FILE]
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import argparse
+import contextlib
+import gc
+import glob
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MYPL = os.path.join(ROOT, 'bin', 'mypl')
+PROGRAMS = os.path.join(ROOT, 'benchmarks', 'programs')
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+sys.path.insert(0, os.path.join(ROOT, 'bin'))
+
+from mpl.mypl_compiler import compile
+
+
+#----------------------------------------------------------------------
+# Engines
+#----------------------------------------------------------------------
+
+# Each engine is a context manager that sets up whatever the engine
+# needs and yields a function taking a program's path and source and
+# returning a function that runs the program once, returning its output.
+
+@contextlib.contextmanager
+def vm_engine():
+    def prepare(path, source):
+        program = compile(source)
+        return lambda: program.run('')
+    yield prepare
+
+
+@contextlib.contextmanager
+def cli_engine():
+    def prepare(path, source):
+        cmd = [sys.executable, MYPL, path]
+        return lambda: subprocess.run(cmd, stdin=subprocess.DEVNULL, capture_output=True,
+                                      text=True, check=True).stdout
+    yield prepare
+
+
+@contextlib.contextmanager
+def server_engine():
+    from mpl.mypl_server import CompileServer
+    from mpl.mypl_client import run_program
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        socket_path = os.path.join(tmp_dir, 'bench.sock')
+        with CompileServer(socket_path) as server:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            def prepare(path, source):
+                return lambda: run_program(socket_path, source=source)[0]
+            try:
+                yield prepare
+            finally:
+                server.shutdown()
+                thread.join()
+
+
+# engine name -> (context manager, whether it can run here)
+ENGINES = {
+    'vm': (vm_engine, True),
+    'cli': (cli_engine, True),
+    'server': (server_engine, hasattr(socket, 'AF_UNIX')),
+}
+
+
+#----------------------------------------------------------------------
+# Measurement
+#----------------------------------------------------------------------
+
+def percentile(values, percent):
+    """Returns the given percentile of values (nearest rank)."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def reference_run(source):
+    """Runs a program in-process, returning its output and the number of
+    VM instructions it executed (the same for every engine).
+
+    """
+    vm = compile(source).vm(io.StringIO(''), io.StringIO())
+    vm.run()
+    return vm.stdout.getvalue(), vm.metrics()['instructions']
+
+
+def time_program(run, runs, warmup=1):
+    """Returns the wall times (in seconds) of runs calls of run, after
+    warmup untimed calls, along with its output.
+
+    """
+    for _ in range(warmup):
+        run()
+    times = []
+    for _ in range(runs):
+        # don't charge one run for collecting another's garbage
+        gc.collect()
+        start = time.perf_counter()
+        output = run()
+        times.append(time.perf_counter() - start)
+    return times, output
+
+
+def run_suite(paths, engines, runs):
+    """Run each program under each engine.
+
+    Returns: A dictionary from program name to a dictionary from engine
+    name to its median and 95th percentile times, instructions per
+    second, and whether its output matched the vm engine's.
+
+    """
+    sources = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            sources[path] = f.read()
+    reference = {path: reference_run(source) for path, source in sources.items()}
+    results = {}
+    for engine in engines:
+        with ENGINES[engine][0]() as prepare:
+            for path, source in sources.items():
+                name = os.path.splitext(os.path.basename(path))[0]
+                times, output = time_program(prepare(path, source), runs)
+                expected, count = reference[path]
+                median = statistics.median(times)
+                results.setdefault(name, {})[engine] = {
+                    'median': median,
+                    'p95': percentile(times, 95),
+                    'instructions': count,
+                    'ips': count / median if median else 0.0,
+                    'output_ok': output == expected,
+                }
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns (program, engine, baseline median, median) for each
+    result whose median is more than threshold (a fraction) slower than
+    the baseline's.
+
+    """
+    regressions = []
+    for name, engines in results.items():
+        for engine, result in engines.items():
+            base = baseline.get(name, {}).get(engine)
+            if base and result['median'] > base['median'] * (1 + threshold):
+                regressions.append((name, engine, base['median'], result['median']))
+    return regressions
+
+
+#----------------------------------------------------------------------
+# Reports
+#----------------------------------------------------------------------
+
+def print_results(results, baseline):
+    print(f'{"program":16} {"engine":8} {"median ms":>10} {"p95 ms":>10} '
+          f'{"Minstr/s":>9} {"vs base":>8}')
+    for name, engines in results.items():
+        for engine, result in engines.items():
+            base = baseline.get(name, {}).get(engine)
+            change = f'{(result["median"] / base["median"] - 1) * 100:+7.1f}%' if base else ''
+            flag = '' if result['output_ok'] else '  WRONG OUTPUT'
+            print(f'{name:16} {engine:8} {result["median"] * 1000:10.1f} '
+                  f'{result["p95"] * 1000:10.1f} {result["ips"] / 1e6:9.2f} {change:>8}{flag}')
+
+
+def load_baseline(path):
+    """Returns the baseline results saved at path (empty if none)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if data.get('machine') != machine():
+        print(f'warning: baseline {path} was saved on a different machine '
+              f'({data.get("machine")})', file=sys.stderr)
+    return data['results']
+
+
+def machine():
+    """Returns a description of this machine and python, stored with
+    baselines.
+
+    """
+    return (f'{platform.system()} {platform.machine()} {os.cpu_count()} cpus '
+            f'python {platform.python_version()}')
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='mypl benchmark suite')
+    argparser.add_argument('programs', nargs='*',
+                           help='names of the programs to run (default: all)')
+    available = [name for name, (_, ok) in ENGINES.items() if ok]
+    argparser.add_argument('--engines', default=','.join(available),
+                           help=f'comma separated engines to use (default: {",".join(available)})')
+    argparser.add_argument('--runs', type=int, default=5,
+                           help='timed runs per program and engine')
+    argparser.add_argument('--baseline', default=BASELINE,
+                           help='baseline results file to compare against')
+    argparser.add_argument('--save-baseline', action='store_true',
+                           help='save the results as the new baseline')
+    argparser.add_argument('--threshold', type=float, default=10.0,
+                           help='percent slowdown flagged as a regression')
+    argparser.add_argument('--report', help='file to write the results to as JSON')
+    args = argparser.parse_args()
+
+    engines = args.engines.split(',')
+    for engine in engines:
+        if engine not in available:
+            argparser.error(f'engine {engine!r} is not available '
+                            f'(choose from {", ".join(available)})')
+    paths = sorted(glob.glob(os.path.join(PROGRAMS, '*.mypl')))
+    if args.programs:
+        paths = [os.path.join(PROGRAMS, name + '.mypl') for name in args.programs]
+
+    results = run_suite(paths, engines, args.runs)
+    baseline = {} if args.save_baseline else load_baseline(args.baseline)
+    print_results(results, baseline)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine(), 'results': results}, f, indent=2)
+            f.write('\n')
+        print(f'saved baseline to {args.baseline}')
+    failed = [name for name, engines in results.items()
+              if not all(result['output_ok'] for result in engines.values())]
+    regressions = compare(results, baseline, args.threshold / 100)
+    for name, engine, before, after in regressions:
+        print(f'REGRESSION: {name} ({engine}) {before * 1000:.1f} ms -> {after * 1000:.1f} ms')
+    for name in failed:
+        print(f'WRONG OUTPUT: {name}')
+    sys.exit(1 if regressions or failed else 0)
+
+
+if __name__ == '__main__':
+    main()
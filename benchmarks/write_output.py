@@ -0,0 +1,78 @@
+"""Output benchmark for the VM's WRITE instruction.
+
+Runs a program that prints a million integers (one WRITE each) and
+reports the run time with the default output buffer and with
+buffering turned off (every WRITE goes straight to the output stream
+and is flushed). The same loop without the print is timed too, so the
+cost of the writes themselves can be read off by subtracting it.
+
+Usage: python3 benchmarks/write_output.py [-n COUNT] [--runs RUNS]
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'bin'))
+
+from mpl.mypl_compiler import compile_source
+from mpl.mypl_vm import VM, OUTPUT_BUFFER_SIZE
+
+PROGRAM = '''
+void main() {
+  int i = 0;
+  while (i < %d) {
+    %s
+    i = i + 1;
+  }
+}
+'''
+
+
+def time_run(program, buffer_size, runs):
+    """Returns the median time (in seconds) to run the program with
+    output written to the null device.
+
+    """
+    times = []
+    for _ in range(runs):
+        with open(os.devnull, 'w', encoding='utf-8') as out:
+            vm = VM(stdout=out, buffer_size=buffer_size)
+            vm.frame_templates = program.frame_templates
+            start = time.perf_counter()
+            vm.run()
+            times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='mypl output benchmark')
+    argparser.add_argument('-n', '--count', type=int, default=1000000,
+                           help='number of integers to print')
+    argparser.add_argument('--runs', type=int, default=3,
+                           help='number of runs per configuration')
+    args = argparser.parse_args()
+
+    program = compile_source(PROGRAM % (args.count, 'print(i);'))
+    loop = compile_source(PROGRAM % (args.count, ''))
+    base = time_run(loop, OUTPUT_BUFFER_SIZE, args.runs)
+    buffered = time_run(program, OUTPUT_BUFFER_SIZE, args.runs)
+    unbuffered = time_run(program, 0, args.runs)
+    print(f'printing {args.count} integers')
+    print(f'loop without print : {base:7.3f} s')
+    for label, seconds in [('buffered', buffered), ('unbuffered', unbuffered)]:
+        print(f'{label:19}: {seconds:7.3f} s '
+              f'({seconds - base:.3f} s writing, '
+              f'{(seconds - base) / args.count * 1e9:.0f} ns per WRITE)')
+
+
+if __name__ == '__main__':
+    main()
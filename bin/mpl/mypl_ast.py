@@ -90,6 +90,7 @@ class DataType:
 class VarDef:
     data_type: DataType
     var_name: Token
+    slot: int = None #frame offset, set by the semantic checker
     def accept(self, visitor):
         visitor.visit_var_def(self)
 
@@ -110,6 +111,8 @@ class FunDef:
     fun_name: Token
     params: List[VarDef]
     stmts: List[Stmt]
+    fun_id: str = None #set by the semantic checker
+    pure: bool = False #set by the purity analysis
     def accept(self, visitor):
         visitor.visit_fun_def(self)
 
@@ -145,6 +148,7 @@ class CallExpr(Stmt, RValue):
     fun_name: Token
     args: List[Expr]
     fun_id: str #added for extention
+    builtin: object = None #the Builtin called, set by the semantic checker
     def accept(self, visitor):
         visitor.visit_call_expr(self)
         
@@ -178,6 +182,7 @@ class NewRValue(RValue):
 class VarRef:
     var_name: Token
     array_expr: Expr
+    slot: int = None #frame offset, set by the semantic checker
         
 @dataclass
 class VarRValue(RValue):
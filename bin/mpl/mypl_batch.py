@@ -0,0 +1,134 @@
+"""Batch runner for executing many MyPL programs across a process pool.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mpl.mypl_error import MyPLError
+from mpl.mypl_compiler import CompiledProgram, compile_source
+from mpl.mypl_cache import cache_key, read_cache, write_cache
+
+
+def find_programs(patterns):
+    """Returns the program paths named by a list of file names and glob
+    patterns, in order.
+
+    """
+    programs = []
+    for pattern in patterns:
+        if any(c in pattern for c in '*?['):
+            programs.extend(sorted(glob.glob(pattern)))
+        else:
+            programs.append(pattern)
+    return programs
+
+
+def stdin_path_for(program, stdin_dir=None):
+    """Returns the input file for a program, or None if it has none. The
+    input for prog.mypl is prog.in, either next to the program or in
+    stdin_dir if given.
+
+    """
+    name = os.path.splitext(os.path.basename(program))[0] + '.in'
+    path = os.path.join(stdin_dir or os.path.dirname(program), name)
+    return path if os.path.isfile(path) else None
+
+
+def run_job(program, stdin_path=None, cache_dir=None):
+    """Compile and run one program with its own input and output.
+
+    Args:
+        program -- The mypl program file.
+        stdin_path -- File the program reads as standard input (optional).
+        cache_dir -- Directory of compiled programs to reuse (optional).
+
+    Returns: A dict with the program's stdout, exit status, and run time.
+
+    """
+    start = time.perf_counter()
+    out = io.StringIO()
+    status = 0
+    try:
+        with open(program, 'r', encoding='utf-8') as f:
+            source = f.read()
+        vm = None
+        if cache_dir:
+            key = cache_key(source)
+            vm = read_cache(cache_dir, key)
+        if vm is None:
+            vm = compile_source(source)
+            if cache_dir:
+                write_cache(cache_dir, key, vm)
+        # the program reads its input file directly, a line at a time
+        stdin = open(stdin_path, 'r', encoding='utf-8') if stdin_path else io.StringIO()
+        with stdin:
+            CompiledProgram(vm).run(stdin, out)
+    except OSError as ex:
+        out.write(f"ERROR: Could not open file '{ex.filename}'\n")
+        status = 1
+    except MyPLError as ex:
+        out.write(f'{ex}\n')
+        status = 1
+    except Exception as ex:
+        out.write(f'ERROR: {type(ex).__name__}: {ex}\n')
+        status = 1
+    return {'program': program,
+            'stdin': stdin_path,
+            'status': status,
+            'seconds': time.perf_counter() - start,
+            'stdout': out.getvalue()}
+
+
+def run_batch(programs, workers=None, stdin_dir=None, cache_dir=None):
+    """Run programs across a pool of worker processes.
+
+    Args:
+        programs -- The mypl program files to run.
+        workers -- Number of worker processes (default: CPU count).
+        stdin_dir -- Directory holding the programs' input files (optional).
+        cache_dir -- Directory of compiled programs to reuse (optional).
+
+    Returns: A report dict with one result per program (in the given
+    order) and summary totals.
+
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_job, program,
+                                   stdin_path_for(program, stdin_dir), cache_dir)
+                   for program in programs]
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - start
+    failed = sum(1 for result in results if result['status'] != 0)
+    return {'workers': workers or os.cpu_count(),
+            'programs': len(results),
+            'failed': failed,
+            'wall_seconds': wall,
+            'cpu_seconds': sum(result['seconds'] for result in results),
+            'results': results}
+
+
+def print_summary(report):
+    """Print a one-line-per-program summary of a batch report."""
+    for result in report['results']:
+        status = 'ok' if result['status'] == 0 else 'FAIL'
+        print(f"{status:4}  {result['seconds']:8.3f}s  {result['program']}")
+    print(f"{report['programs']} programs, {report['failed']} failed, "
+          f"{report['wall_seconds']:.3f}s wall, "
+          f"{report['cpu_seconds']:.3f}s in programs, "
+          f"{report['workers']} workers")
+
+
+def write_report(path, report):
+    """Write a batch report as JSON."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,76 @@
+"""Registry of the MyPL built-in functions.
+
+Built-ins are keyed by function id (the name plus the parameter types,
+as in print_int or length_intarray) so that the semantic checker and
+code generator can look them up in one step. To add a built-in,
+register it here with the opcode that implements it.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+from mpl.mypl_opcode import OpCode
+
+
+class Builtin:
+    """A built-in function signature and its implementing opcode."""
+
+    __slots__ = ('fun_id', 'params', 'return_type', 'opcode')
+
+    def __init__(self, fun_id, params, return_type, opcode):
+        """Create a built-in.
+
+        Args:
+            fun_id -- The function id (name and parameter types).
+            params -- The (type name, is array) of each parameter.
+            return_type -- The name of the return type.
+            opcode -- The OpCode emitted for a call.
+
+        """
+        self.fun_id = fun_id
+        self.params = params
+        self.return_type = return_type
+        self.opcode = opcode
+
+
+    def __repr__(self):
+        return f'Builtin({self.fun_id}: {self.return_type}, {self.opcode.name})'
+
+
+def fun_id(name, params):
+    """Returns the function id for a function name and parameters, each
+    given as (type name, is array).
+
+    """
+    return ''.join([name] + [f'_{t}array' if is_array else f'_{t}' for t, is_array in params])
+
+
+def _builtin(name, params, return_type, opcode):
+    return Builtin(fun_id(name, params), tuple(params), return_type, opcode)
+
+
+def length_builtin(type_name, is_array=True):
+    """Returns the length built-in for (arrays of) the given type."""
+    return _builtin('length', [(type_name, is_array)], 'int', OpCode.LEN)
+
+
+BASE_TYPES = ['int', 'double', 'bool', 'string']
+
+# opcodes of the built-ins that do I/O (a function calling one isn't pure)
+IO_OPCODES = {OpCode.WRITE, OpCode.READ}
+
+BUILTINS = {builtin.fun_id: builtin for builtin in [
+    *[_builtin('print', [(t, False)], 'void', OpCode.WRITE) for t in BASE_TYPES],
+    _builtin('input', [], 'string', OpCode.READ),
+    _builtin('itos', [('int', False)], 'string', OpCode.TOSTR),
+    _builtin('itod', [('int', False)], 'double', OpCode.TODBL),
+    _builtin('dtos', [('double', False)], 'string', OpCode.TOSTR),
+    _builtin('dtoi', [('double', False)], 'int', OpCode.TOINT),
+    _builtin('stoi', [('string', False)], 'int', OpCode.TOINT),
+    _builtin('stod', [('string', False)], 'double', OpCode.TODBL),
+    _builtin('get', [('int', False), ('string', False)], 'string', OpCode.GETC),
+    *[length_builtin(t) for t in BASE_TYPES],
+    length_builtin('string', False),
+]}
@@ -0,0 +1,142 @@
+"""On-disk cache of compiled MyPL programs.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import functools
+import hashlib
+import json
+import os
+
+from mpl.mypl_opcode import OpCode
+from mpl.mypl_frame import VMFrameTemplate, VMInstr
+from mpl.mypl_vm import VM
+
+
+# bump FORMAT_VERSION whenever the artifact layout changes so that
+# stale cache entries are ignored
+FORMAT_VERSION = 3
+
+
+def source_hash(package_dir):
+    """Returns a hash of the python source files in a directory."""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith('.py'):
+            with open(os.path.join(package_dir, name), 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_version():
+    """Returns a hash of the compiler's source files, so that a change
+    to any of them (and so possibly to the generated code) gives new
+    cache keys. It is computed on first use rather than on import, to
+    keep startup cheap.
+
+    """
+    return source_hash(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cache_key(source, opt_level=0):
+    """Returns the cache key for a program's source text.
+
+    Args:
+        source -- The text of the mypl program.
+        opt_level -- The optimization level it is compiled at.
+
+    """
+    tag = f'mypl-{compiler_version()}-{FORMAT_VERSION}-O{opt_level}\n'
+    return hashlib.sha256((tag + source).encode('utf-8')).hexdigest()
+
+
+def dump(vm):
+    """Returns the compiled program loaded in the VM as a JSON-compatible
+    artifact.
+
+    Args:
+        vm -- A VM loaded with frame templates.
+
+    """
+    functions = []
+    for template in vm.frame_templates.values():
+        instrs = [[instr.opcode.name, instr.operand] for instr in template.instructions]
+        functions.append({'name': template.function_name,
+                          'arg_count': template.arg_count,
+                          'instructions': instrs,
+                          'lines': template.line_table,
+                          'pure': template.pure})
+    return {'format': FORMAT_VERSION,
+            'compiler': compiler_version(),
+            'structs': vm.struct_fields,
+            'functions': functions}
+
+
+def load(artifact):
+    """Returns a VM loaded with the program in the given artifact, or None
+    if the artifact was written by a different compiler or format.
+
+    Args:
+        artifact -- A compiled program as produced by dump().
+
+    """
+    if artifact.get('format') != FORMAT_VERSION:
+        return None
+    if artifact.get('compiler') != compiler_version():
+        return None
+    vm = VM()
+    for struct_name, field_names in artifact['structs'].items():
+        vm.add_struct_fields(struct_name, field_names)
+    for function in artifact['functions']:
+        lines = [tuple(entry) for entry in function['lines']]
+        template = VMFrameTemplate(function['name'], function['arg_count'],
+                                   line_table=lines)
+        template.pure = function['pure']
+        for opcode, operand in function['instructions']:
+            template.instructions.append(VMInstr(OpCode[opcode], operand))
+        vm.add_frame_template(template)
+    return vm
+
+
+def read_cache(cache_dir, key):
+    """Returns a VM loaded from the cache entry for key, or None if there
+    is no usable entry.
+
+    Args:
+        cache_dir -- The cache directory.
+        key -- The program's cache key.
+
+    """
+    path = os.path.join(cache_dir, key + '.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return load(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_cache(cache_dir, key, vm):
+    """Write the program loaded in the VM to the cache entry for key.
+    Failures to write are ignored since the cache is only an
+    optimization.
+
+    Args:
+        cache_dir -- The cache directory.
+        key -- The program's cache key.
+        vm -- A VM loaded with frame templates.
+
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, key + '.json')
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dump(vm), f, separators=(',', ':'))
+        # atomic so concurrent runs never see a partial entry
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
@@ -0,0 +1,130 @@
+"""Call graph of a checked MyPL program, and dead function elimination.
+
+The call graph maps each function (by the function id the semantic
+checker gives it) to the functions it calls. Functions that cannot be
+reached from main through the graph are never called, so they can be
+dropped from the program before code generation. Unused functions are
+still type checked (an error in one is still an error), so this pass
+runs after the semantic checker.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+from mpl.mypl_ast import *
+
+
+class CallGraph (Visitor):
+    """Visitor building the call graph of a checked program."""
+
+    def __init__(self):
+        # function id -> set of ids of the (non built-in) functions it calls
+        self.calls = {}
+        # calls of the function being visited
+        self.curr_calls = None
+
+
+    def reachable(self, root='main'):
+        """Returns the ids of the functions reachable from root (root
+        included).
+
+        """
+        seen = {root}
+        pending = [root]
+        while pending:
+            for callee in self.calls.get(pending.pop(), ()):
+                if callee not in seen:
+                    seen.add(callee)
+                    pending.append(callee)
+        return seen
+
+
+    def visit_path(self, path):
+        for var_ref in path:
+            if var_ref.array_expr:
+                var_ref.array_expr.accept(self)
+
+
+    def visit_stmts(self, stmts):
+        for stmt in stmts:
+            stmt.accept(self)
+
+    # Visitor Functions
+
+    def visit_program(self, program):
+        for fun_def in program.fun_defs:
+            fun_def.accept(self)
+
+    def visit_fun_def(self, fun_def):
+        self.curr_calls = self.calls.setdefault(fun_def.fun_id, set())
+        self.visit_stmts(fun_def.stmts)
+
+    def visit_return_stmt(self, return_stmt):
+        return_stmt.expr.accept(self)
+
+    def visit_var_decl(self, var_decl):
+        if var_decl.expr:
+            var_decl.expr.accept(self)
+
+    def visit_assign_stmt(self, assign_stmt):
+        self.visit_path(assign_stmt.lvalue)
+        assign_stmt.expr.accept(self)
+
+    def visit_while_stmt(self, while_stmt):
+        while_stmt.condition.accept(self)
+        self.visit_stmts(while_stmt.stmts)
+
+    def visit_for_stmt(self, for_stmt):
+        for_stmt.var_decl.accept(self)
+        for_stmt.condition.accept(self)
+        for_stmt.assign_stmt.accept(self)
+        self.visit_stmts(for_stmt.stmts)
+
+    def visit_if_stmt(self, if_stmt):
+        for basic_if in [if_stmt.if_part] + if_stmt.else_ifs:
+            basic_if.condition.accept(self)
+            self.visit_stmts(basic_if.stmts)
+        self.visit_stmts(if_stmt.else_stmts)
+
+    def visit_call_expr(self, call_expr):
+        if call_expr.builtin is None:
+            self.curr_calls.add(call_expr.fun_id)
+        for arg in call_expr.args:
+            arg.accept(self)
+
+    def visit_expr(self, expr):
+        expr.first.accept(self)
+        if expr.rest:
+            expr.rest.accept(self)
+
+    def visit_simple_term(self, simple_term):
+        simple_term.rvalue.accept(self)
+
+    def visit_complex_term(self, complex_term):
+        complex_term.expr.accept(self)
+
+    def visit_new_rvalue(self, new_rvalue):
+        if new_rvalue.array_expr:
+            new_rvalue.array_expr.accept(self)
+        for param in new_rvalue.struct_params or []:
+            param.accept(self)
+
+    def visit_var_rvalue(self, var_rvalue):
+        self.visit_path(var_rvalue.path)
+
+
+def eliminate_dead_functions(program):
+    """Remove the functions a checked program can never call from its
+    function definitions.
+
+    Returns: The number of functions removed.
+
+    """
+    graph = CallGraph()
+    program.accept(graph)
+    live = graph.reachable()
+    count = len(program.fun_defs)
+    program.fun_defs = [f for f in program.fun_defs if f.fun_id in live]
+    return count - len(program.fun_defs)
@@ -0,0 +1,68 @@
+"""Thin client for the MyPL compile server.
+
+The client and server exchange one JSON object per line over a Unix
+domain socket. A request holds either a program "path" or its
+"source", plus the text to use as the program's "stdin". The reply
+holds the program's "stdout" and its exit "status".
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import json
+import os
+import socket
+
+
+def default_socket_path():
+    """Returns the per-user socket path used when none is given."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR', '/tmp')
+    return os.path.join(runtime_dir, f'mypl-{os.getuid()}.sock')
+
+
+def send_request(socket_path, request):
+    """Send a request to the server and return its reply.
+
+    Args:
+        socket_path -- The server's socket path.
+        request -- The request object (path or source, and stdin).
+
+    Raises ValueError if the server's reply is empty or malformed.
+
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile('rb') as reply:
+            line = reply.readline()
+    try:
+        reply = json.loads(line)
+    except ValueError:
+        reply = None
+    if not isinstance(reply, dict) or 'stdout' not in reply or 'status' not in reply:
+        raise ValueError(f'invalid reply from mypl server: {line[:80]!r}')
+    return reply
+
+
+def run_program(socket_path, path=None, source=None, stdin=''):
+    """Run a program on the server.
+
+    Args:
+        socket_path -- The server's socket path.
+        path -- The program file (used if source is not given).
+        source -- The program text.
+        stdin -- The text the program reads as standard input.
+
+    Returns: The (stdout, exit status) of the program.
+
+    """
+    request = {'stdin': stdin}
+    if source is not None:
+        request['source'] = source
+    else:
+        request['path'] = os.path.abspath(path)
+    reply = send_request(socket_path, request)
+    return reply['stdout'], reply['status']
@@ -6,46 +6,59 @@ CLASS: CPSC 326
 
 """
 
+import threading
+
+from mpl.mypl_error import *
 from mpl.mypl_token import *
 from mpl.mypl_ast import *
-from mpl.mypl_var_table import *
 from mpl.mypl_frame import *
 from mpl.mypl_opcode import *
-from mpl.mypl_vm import *
 
-length_types = ['length_intarray', 'length_doublearray', 'length_stringarray', 'length_boolarray','length_string']
 class CodeGenerator (Visitor):
 
-    def __init__(self, vm):
+    def __init__(self, vm, lazy=False, checker=None):
         """Creates a new Code Generator given a VM. 
         
         Args:
             vm -- The target vm.
+            lazy -- Add a stub template for each function, and generate
+                    its code the first time the VM calls it.
+            checker -- The SemanticChecker to check each function's body
+                       with before generating its code (for lazy code
+                       generation of a program checked without bodies).
         """
         # the vm to add frames to
         self.vm = vm
+        self.lazy = lazy
+        self.checker = checker
+        # stubs may be called from several threads' VMs at once
+        self.lock = threading.Lock()
         # the current frame template being generated
         self.curr_template = None
-        # for var -> index mappings wrt to environments
-        self.var_table = VarTable()
         # struct name -> StructDef for struct field info
         self.struct_defs = {}
+        # source (line, column) of the instructions being generated
+        self.curr_pos = None
+
 
+    def mark(self, token):
+        """Helper function to set the source position of the instructions
+        added next.
+
+        """
+        self.curr_pos = (token.line, token.column)
 
     
     def add_instr(self, instr):
-        """Helper function to add an instruction to the current template."""
-        self.curr_template.instructions.append(instr)
-    
-    #used to generate the function id from the information in the fun_def node
-    def get_fun_id(self, fun_def):
-        id = fun_def.fun_name.lexeme
-        for param in fun_def.params:
-            id += '_'
-            id += param.data_type.type_name.lexeme
-            if param.data_type.is_array:
-                id += 'array'
-        return id
+        """Helper function to add an instruction to the current template,
+        extending the template's line table if the position changed.
+
+        """
+        template = self.curr_template
+        table = template.line_table
+        if self.curr_pos is not None and (not table or table[-1][1:] != self.curr_pos):
+            table.append((len(template.instructions),) + self.curr_pos)
+        template.instructions.append(instr)
 
         
     def visit_program(self, program):
@@ -58,22 +71,57 @@ class CodeGenerator (Visitor):
     def visit_struct_def(self, struct_def):
         # remember the struct def for later
         self.struct_defs[struct_def.struct_name.lexeme] = struct_def
-        length_types.append('length_'+ struct_def.struct_name.lexeme +'array')
+        field_names = [field.var_name.lexeme for field in struct_def.fields]
+        self.vm.add_struct_fields(struct_def.struct_name.lexeme, field_names)
 
         
-    def visit_fun_def(self, fun_def):
-        self.curr_template = VMFrameTemplate(self.get_fun_id(fun_def), len(fun_def.params))
-        self.var_table.push_environment()
+    def add_stub(self, fun_def):
+        """Helper function to add a template for a function whose code is
+        generated when the template is first called.
+
+        """
+        stub = VMFrameTemplate(fun_def.fun_id, len(fun_def.params))
+        stub.pure = fun_def.pure
+        def generate():
+            with self.lock:
+                if stub.generate is None:
+                    return
+                if self.checker is not None:
+                    self.checker.check_function(fun_def)
+                self.generate_function(fun_def)
+                self.vm.link_template(self.curr_template)
+                stub.instructions = self.curr_template.instructions
+                stub.line_table = self.curr_template.line_table
+                stub.generate = None
+        stub.generate = generate
+        self.vm.add_frame_template(stub)
+
+
+    def generate_function(self, fun_def):
+        """Helper function to generate the code of a function into a new
+        current template.
+
+        """
+        # function ids and variable offsets are resolved by the
+        # semantic checker, so no scopes are tracked here
+        self.curr_template = VMFrameTemplate(fun_def.fun_id, len(fun_def.params))
+        self.curr_template.pure = fun_def.pure
+        self.mark(fun_def.fun_name)
         for param in fun_def.params:
-            self.var_table.add(param.var_name.lexeme)
-            self.add_instr(STORE(self.var_table.get(param.var_name.lexeme)))
+            self.add_instr(STORE(param.slot))
         for stmt in fun_def.stmts:
             stmt.accept(self)
         if fun_def.return_type.type_name.lexeme == 'void':
             self.add_instr(PUSH(None))
             self.add_instr(RET())
-        self.var_table.pop_environment()
-        self.vm.add_frame_template(self.curr_template)
+
+
+    def visit_fun_def(self, fun_def):
+        if self.lazy:
+            self.add_stub(fun_def)
+        else:
+            self.generate_function(fun_def)
+            self.vm.add_frame_template(self.curr_template)
         
 
     def visit_return_stmt(self, return_stmt):
@@ -82,41 +130,54 @@ class CodeGenerator (Visitor):
 
         
     def visit_var_decl(self, var_decl):
-        self.var_table.add(var_decl.var_def.var_name.lexeme)
+        self.mark(var_decl.var_def.var_name)
         if var_decl.expr:
             var_decl.expr.accept(self)
+            self.mark(var_decl.var_def.var_name)
         else:
             self.add_instr(PUSH(None))
-        self.add_instr(STORE(self.var_table.get(var_decl.var_def.var_name.lexeme)))
+        self.add_instr(STORE(var_decl.var_def.slot))
             
         
     def visit_assign_stmt(self, assign_stmt):
+        # the store is attributed to the assigned variable (the last
+        # variable in the path)
+        target = assign_stmt.lvalue[-1].var_name
+        self.mark(assign_stmt.lvalue[0].var_name)
         if len(assign_stmt.lvalue) == 1:    
             if assign_stmt.lvalue[0].array_expr:
-                self.add_instr(LOAD(self.var_table.get(assign_stmt.lvalue[0].var_name.lexeme)))
+                self.add_instr(LOAD(assign_stmt.lvalue[0].slot))
                 assign_stmt.lvalue[0].array_expr.accept(self)
                 assign_stmt.expr.accept(self)
+                self.mark(target)
                 self.add_instr(SETI())
             else:
                 assign_stmt.expr.accept(self)
-                self.add_instr(STORE(self.var_table.get(assign_stmt.lvalue[0].var_name.lexeme)))
+                self.mark(target)
+                self.add_instr(STORE(assign_stmt.lvalue[0].slot))
         else:
-            self.add_instr(LOAD(self.var_table.get(assign_stmt.lvalue[0].var_name.lexeme)))
+            self.add_instr(LOAD(assign_stmt.lvalue[0].slot))
             if assign_stmt.lvalue[0].array_expr:
                 assign_stmt.lvalue[0].array_expr.accept(self)
+                self.mark(assign_stmt.lvalue[0].var_name)
                 self.add_instr(GETI())
             for var_ref in assign_stmt.lvalue[1:-1]:
+                self.mark(var_ref.var_name)
                 self.add_instr(GETF(var_ref.var_name.lexeme))
                 if var_ref.array_expr:
                     var_ref.array_expr.accept(self)
+                    self.mark(var_ref.var_name)
                     self.add_instr(GETI())
+            self.mark(target)
             if assign_stmt.lvalue[-1].array_expr:
                 self.add_instr(GETF(assign_stmt.lvalue[-1].var_name.lexeme))
                 assign_stmt.lvalue[-1].array_expr.accept(self)
                 assign_stmt.expr.accept(self)
+                self.mark(target)
                 self.add_instr(SETI())
             else:
                 assign_stmt.expr.accept(self)
+                self.mark(target)
                 self.add_instr(SETF(assign_stmt.lvalue[-1].var_name.lexeme))
 
 
@@ -125,41 +186,33 @@ class CodeGenerator (Visitor):
         while_stmt.condition.accept(self)
         jump_end = JMPF(-1)
         self.add_instr(jump_end)
-        self.var_table.push_environment()
         for stmt in while_stmt.stmts:
             stmt.accept(self)
-        self.var_table.pop_environment()
         self.add_instr(JMP(jump_index))
         self.add_instr(NOP())
         jump_end.operand = len(self.curr_template.instructions) -1
 
         
     def visit_for_stmt(self, for_stmt):
-        self.var_table.push_environment()
         for_stmt.var_decl.accept(self)
         jump_index = len(self.curr_template.instructions)
         for_stmt.condition.accept(self)
         jump_end = JMPF(-1)
         self.add_instr(jump_end)
-        self.var_table.push_environment()
         for stmt in for_stmt.stmts:
             stmt.accept(self)
-        self.var_table.pop_environment()
         for_stmt.assign_stmt.accept(self)
         self.add_instr(JMP(jump_index))
         self.add_instr(NOP())
         jump_end.operand = len(self.curr_template.instructions) -1
-        self.var_table.pop_environment()
 
     
     def visit_if_stmt(self, if_stmt):
         if_stmt.if_part.condition.accept(self)
         jump_next = JMPF(-1)
         self.add_instr(jump_next)
-        self.var_table.push_environment()
         for stmt in if_stmt.if_part.stmts:
             stmt.accept(self)
-        self.var_table.pop_environment()
         jump_end = JMP(-1)
         self.add_instr(jump_end)
         jump_next.operand = len(self.curr_template.instructions)
@@ -168,17 +221,13 @@ class CodeGenerator (Visitor):
                 else_if.condition.accept(self)
                 jump_next_elif = JMPF(-1)
                 self.add_instr(jump_next_elif)
-                self.var_table.push_environment()
                 for stmt in else_if.stmts:
                     stmt.accept(self)
-                self.var_table.pop_environment()
                 self.add_instr(jump_end)
                 jump_next_elif.operand = len(self.curr_template.instructions)
         if if_stmt.else_stmts:
-            self.var_table.push_environment()
             for stmt in if_stmt.else_stmts:
                 stmt.accept(self)
-            self.var_table.pop_environment()
         self.add_instr(NOP())
         jump_end.operand = len(self.curr_template.instructions) -1
             
@@ -186,26 +235,10 @@ class CodeGenerator (Visitor):
     def visit_call_expr(self, call_expr):
         for arg in call_expr.args:
             arg.accept(self)
-        if call_expr.fun_id in ['print_string','print_int','print_double','print_bool']:
-            self.add_instr(WRITE())
-        elif call_expr.fun_id == 'itos_int':
-            self.add_instr(TOSTR())
-        elif call_expr.fun_id == 'dtos_double':
-            self.add_instr(TOSTR())
-        elif call_expr.fun_id == 'itod_int':
-            self.add_instr(TODBL())
-        elif call_expr.fun_id == 'stod_string':
-            self.add_instr(TODBL())
-        elif call_expr.fun_id == 'stoi_string':
-            self.add_instr(TOINT())
-        elif call_expr.fun_id == 'dtoi_double':
-            self.add_instr(TOINT())
-        elif call_expr.fun_id == 'input':
-            self.add_instr(READ())
-        elif call_expr.fun_id in length_types:
-            self.add_instr(LEN())
-        elif call_expr.fun_id == 'get_int_string':
-            self.add_instr(GETC())
+        self.mark(call_expr.fun_name)
+        # built-ins were resolved by the semantic checker
+        if call_expr.builtin is not None:
+            self.add_instr(VMInstr(call_expr.builtin.opcode))
         else:
             self.add_instr(CALL(call_expr.fun_id))
 
@@ -215,6 +248,7 @@ class CodeGenerator (Visitor):
             if expr.op.lexeme == '>=' or expr.op.lexeme == '>':
                 expr.rest.accept(self)
                 expr.first.accept(self)
+                self.mark(expr.op)
                 if expr.op.lexeme == '>=':
                     self.add_instr(CMPLE())
                 if expr.op.lexeme == '>':
@@ -222,6 +256,7 @@ class CodeGenerator (Visitor):
             else:
                 expr.first.accept(self)
                 expr.rest.accept(self)
+                self.mark(expr.op)
                 if expr.op.lexeme == '+':
                     self.add_instr(ADD())
                 if expr.op.lexeme == '-':
@@ -259,7 +294,15 @@ class CodeGenerator (Visitor):
 
     
     def visit_simple_term(self, simple_term):
-        simple_term.rvalue.accept(self)
+        rvalue = simple_term.rvalue
+        # a void built-in (print) leaves no value on the stack; the
+        # checker types its calls like null, so it is caught here
+        if isinstance(rvalue, CallExpr) and rvalue.builtin is not None \
+           and rvalue.builtin.return_type == 'void':
+            token = rvalue.fun_name
+            raise StaticError(f'void function call used as a value near line '
+                              f'{token.line}, column {token.column}')
+        rvalue.accept(self)
 
         
     def visit_complex_term(self, complex_term):
@@ -267,6 +310,7 @@ class CodeGenerator (Visitor):
 
         
     def visit_simple_rvalue(self, simple_rvalue):
+        self.mark(simple_rvalue.value)
         val = simple_rvalue.value.lexeme
         if simple_rvalue.value.token_type == TokenType.INT_VAL:
             self.add_instr(PUSH(int(val)))
@@ -287,24 +331,32 @@ class CodeGenerator (Visitor):
     def visit_new_rvalue(self, new_rvalue):
         if new_rvalue.array_expr:
             new_rvalue.array_expr.accept(self)
+            self.mark(new_rvalue.type_name)
             self.add_instr(ALLOCA())
         elif new_rvalue.type_name.lexeme in self.struct_defs:
+            self.mark(new_rvalue.type_name)
             self.add_instr(ALLOCS())
             for count, expr in enumerate(new_rvalue.struct_params):
+                self.mark(new_rvalue.type_name)
                 self.add_instr(DUP())
                 expr.accept(self)
+                self.mark(new_rvalue.type_name)
                 self.add_instr(SETF(self.struct_defs[new_rvalue.type_name.lexeme].fields[count].var_name.lexeme))
 
     
     def visit_var_rvalue(self, var_rvalue):
-        self.add_instr(LOAD(self.var_table.get(var_rvalue.path[0].var_name.lexeme)))
+        self.mark(var_rvalue.path[0].var_name)
+        self.add_instr(LOAD(var_rvalue.path[0].slot))
         if var_rvalue.path[0].array_expr:
             var_rvalue.path[0].array_expr.accept(self)
+            self.mark(var_rvalue.path[0].var_name)
             self.add_instr(GETI())
         for var_ref in var_rvalue.path[1:]:
+            self.mark(var_ref.var_name)
             self.add_instr(GETF(var_ref.var_name.lexeme))
             if var_ref.array_expr:
                 var_ref.array_expr.accept(self)
+                self.mark(var_ref.var_name)
                 self.add_instr(GETI())
 
 
@@ -0,0 +1,147 @@
+"""Compile pipeline for turning MyPL source text into VM frame templates.
+
+This is also the embedding API: compile() a program once, then run the
+CompiledProgram as many times as needed, from any number of threads.
+For example:
+
+    program = compile('void main() {print(input());}')
+    out = program.run(stdin='hello')
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import io
+
+from mpl.mypl_iowrapper import FileWrapper
+from mpl.mypl_lexer import Lexer
+from mpl.mypl_ast_parser import ASTParser
+from mpl.mypl_semantic_checker import SemanticChecker
+from mpl.mypl_call_graph import eliminate_dead_functions
+from mpl.mypl_purity import mark_pure_functions
+from mpl.mypl_code_gen import CodeGenerator
+from mpl.mypl_inliner import inline_functions
+from mpl.mypl_vm import VM
+
+
+def compile_source(source, lazy=False, eager_check=False, opt_level=0):
+    """Lex, parse, check, and generate code for a mypl program. Code is
+    only generated for the functions reachable from main.
+
+    Args:
+        source -- The text of the mypl program.
+        lazy -- Generate each function's code the first time it is
+                called. Only the function signatures are checked up
+                front, and each function's body is checked when its
+                code is generated, so a static error in a function
+                is raised when it is first called.
+        eager_check -- With lazy, check every function body up front.
+                       Pure functions (see mypl_purity) are only found
+                       with lazy if eager_check is set.
+        opt_level -- Optimization level: 0 for none, 1 to inline calls
+                     of small functions, 2 to inline larger ones too
+                     (ignored with lazy).
+
+    Returns: A VM loaded with the program's frame templates.
+
+    """
+    lexer = Lexer(FileWrapper(io.StringIO(source)))
+    ast = ASTParser(lexer).parse()
+    vm = VM()
+    if lazy:
+        checker = SemanticChecker(check_bodies=eager_check)
+        ast.accept(checker)
+        # purity needs every body checked
+        if eager_check:
+            mark_pure_functions(ast)
+        ast.accept(CodeGenerator(vm, lazy=True, checker=None if eager_check else checker))
+        vm.link()
+        return vm
+    ast.accept(SemanticChecker())
+    eliminate_dead_functions(ast)
+    mark_pure_functions(ast)
+    ast.accept(CodeGenerator(vm))
+    inline_functions(vm, opt_level)
+    vm.link()
+    return vm
+
+
+class CompiledProgram:
+    """A compiled mypl program that can be run many times.
+
+    The frame templates are shared (read only) by every run, and each
+    run gets its own VM, so runs are independent of one another and
+    safe to make concurrently from several threads.
+
+    """
+
+    def __init__(self, vm):
+        """Create a program from a VM loaded with its frame templates."""
+        if not vm.linked:
+            vm.link()
+        self.frame_templates = vm.frame_templates
+        self.struct_fields = vm.struct_fields
+
+
+    def vm(self, stdin=None, stdout=None):
+        """Returns a fresh VM loaded with the program.
+
+        Args:
+            stdin -- Text stream read by the program (default: standard input).
+            stdout -- Text stream written by the program (default: standard output).
+
+        """
+        vm = VM(stdin, stdout)
+        vm.frame_templates = self.frame_templates
+        vm.linked = True
+        vm.struct_fields = self.struct_fields
+        return vm
+
+
+    def run(self, stdin='', stdout=None, limits=None):
+        """Run the program. Errors are raised as MyPLError (or a python
+        exception for errors like reading past the end of the input)
+        rather than exiting.
+
+        Args:
+            stdin -- The program's input, as a string or a text stream
+                     (any object with a readline method).
+            stdout -- Text stream to write the program's output to.
+            limits -- Execution limits, as keyword arguments to
+                      VM.set_limits (optional).
+
+        Returns: The program's output if stdout is None, otherwise None.
+
+        """
+        if isinstance(stdin, str):
+            stdin = io.StringIO(stdin)
+        out = io.StringIO() if stdout is None else stdout
+        vm = self.vm(stdin, out)
+        if limits:
+            vm.set_limits(**limits)
+        vm.run()
+        if stdout is None:
+            return out.getvalue()
+        return None
+
+
+def compile(source, lazy=False, eager_check=False, opt_level=0):
+    """Compile a mypl program.
+
+    Args:
+        source -- The text of the mypl program.
+        lazy -- Generate each function's code the first time it is
+                called (see compile_source).
+        eager_check -- With lazy, check every function body up front.
+                       Pure functions (see mypl_purity) are only found
+                       with lazy if eager_check is set.
+        opt_level -- Optimization level (see compile_source).
+
+    Returns: The CompiledProgram. Raises MyPLError if the program has
+    a lexical, syntax, or static error (with lazy, static errors in
+    function bodies are raised when the function is first called).
+
+    """
+    return CompiledProgram(compile_source(source, lazy, eager_check, opt_level))
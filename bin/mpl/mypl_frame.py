@@ -8,34 +8,79 @@ CLASS: CPSC 326
 """
 
 
-from dataclasses import dataclass, field
-from typing import Any
+from bisect import bisect_right
+
 from mpl.mypl_opcode import OpCode
 
 
-@dataclass
+# Plain slotted classes (rather than dataclasses) keep the runtime
+# modules cheap to import and frames cheap to create.
+
 class VMFrameTemplate:
     """A VM function-call frame template (type)."""
-    function_name: str
-    arg_count: int
-    instructions: list['VMInstr'] = field(default_factory=list) 
+    __slots__ = ('function_name', 'arg_count', 'instructions', 'line_table', 'generate',
+                 'pure')
+
+    def __init__(self, function_name, arg_count, instructions=None, line_table=None):
+        self.function_name = function_name
+        self.arg_count = arg_count
+        self.instructions = [] if instructions is None else instructions
+        # (first pc, line, column) for each run of instructions generated
+        # from the same source position, in pc order
+        self.line_table = [] if line_table is None else line_table
+        # for a template whose code is generated lazily, a function that
+        # generates it (None once it has been generated)
+        self.generate = None
+        # whether the function is pure (see mypl_purity), so calls of it
+        # can be memoized
+        self.pure = False
+
+    def position(self, pc):
+        """Returns the source (line, column) of the instruction at pc, or
+        None if it is not known.
+
+        """
+        i = bisect_right(self.line_table, (pc, float('inf'))) - 1
+        if i < 0:
+            return None
+        return self.line_table[i][1:]
+
+    def __repr__(self):
+        return (f'VMFrameTemplate(function_name={self.function_name!r}, '
+                f'arg_count={self.arg_count!r}, '
+                f'instructions={self.instructions!r})')
 
     
-@dataclass
 class VMFrame:
     """A VM function-call frame."""
-    template: VMFrameTemplate
-    pc: int = 0
-    variables: list[Any] = field(default_factory=list) 
-    operand_stack: list[Any] = field(default_factory=list) 
+    __slots__ = ('template', 'pc', 'variables', 'operand_stack')
+
+    def __init__(self, template, pc=0, variables=None, operand_stack=None):
+        self.template = template
+        self.pc = pc
+        self.variables = [] if variables is None else variables
+        self.operand_stack = [] if operand_stack is None else operand_stack
 
 
-@dataclass
 class VMInstr:
     """A VM instruction."""
-    opcode: OpCode
-    operand: Any = None
-    comment: str = ''
+    __slots__ = ('opcode', 'operand', 'comment', 'target')
+
+    def __init__(self, opcode, operand=None, comment=''):
+        self.opcode = opcode
+        self.operand = operand
+        self.comment = comment
+        # for CALL, the template of the function called (set when the
+        # program is linked)
+        self.target = None
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.opcode, self.operand, self.comment) == \
+            (other.opcode, other.operand, other.comment)
+
+    __hash__ = None
 
     def __repr__(self):
         s = f'{self.opcode}('
@@ -0,0 +1,238 @@
+"""Function inlining for generated MyPL code.
+
+Replaces calls of small functions that make no calls of their own
+with a copy of the function's instructions, saving the new frame,
+argument passing, and return of each call. The copy runs in the
+caller's frame, so the callee's variables are renumbered to slots
+past the caller's: at each call site, the copy's first variable is
+the lowest slot that is guaranteed to exist in the caller's frame
+there (the VM creates a variable slot by storing to the slot just past
+the last one). Slots are given out by scope, so the caller's variables
+in scope at the call are all below it, and any existing slot at or
+above it belongs to a variable that is out of scope.
+
+Since an inlined function is no longer called, the functions main can
+no longer reach are dropped afterwards.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+from mpl.mypl_opcode import OpCode, STACK_EFFECTS
+from mpl.mypl_frame import VMInstr
+
+
+# optimization level -> max instructions in an inlined function
+INLINE_SIZES = {0: 0, 1: 24, 2: 64}
+
+# times to repeat inlining, so that a function that only calls small
+# functions can itself be inlined once they have been
+INLINE_ROUNDS = 3
+
+
+def inlinable(template, max_size):
+    """Returns true if calls of a template can be inlined."""
+    instrs = template.instructions
+    if template.generate is not None or template.function_name == 'main':
+        return False
+    if not instrs or len(instrs) > max_size or any(i.opcode == OpCode.CALL for i in instrs):
+        return False
+    # running off the end of a function ends the program, which a copy
+    # can't do
+    if instrs[-1].opcode != OpCode.RET or any(
+            i.opcode in (OpCode.JMP, OpCode.JMPF) and i.operand >= len(instrs) for i in instrs):
+        return False
+    # the code generator stores the arguments first, in slot order
+    n = template.arg_count
+    if not all(instr.opcode == OpCode.STORE and instr.operand == i
+               for i, instr in enumerate(instrs[:n])):
+        return False
+    return returns_one_value(template)
+
+
+def returns_one_value(template):
+    """Returns true if the operand stack holds just the return value at
+    each return of a template (with no calls). A builtin called as a
+    statement leaves its result on the stack, which a copy of the
+    function would leave on the caller's stack.
+
+    """
+    instrs = template.instructions
+    depths = {}
+    pending = [(0, template.arg_count)]
+    while pending:
+        pc, depth = pending.pop()
+        if pc in depths:
+            # paths that meet must agree on the stack size
+            if depths[pc] != depth:
+                return False
+            continue
+        depths[pc] = depth
+        instr = instrs[pc]
+        opcode = instr.opcode
+        if opcode == OpCode.RET:
+            if depth != 1:
+                return False
+            continue
+        depth += STACK_EFFECTS[opcode]
+        if opcode == OpCode.JMP:
+            pending.append((instr.operand, depth))
+        elif opcode == OpCode.JMPF:
+            pending += [(pc + 1, depth), (instr.operand, depth)]
+        else:
+            pending.append((pc + 1, depth))
+    return True
+
+
+def defined_slots(template):
+    """Returns, for each pc of a template, the number of variable slots
+    that exist whenever that instruction runs (None if it can't run).
+
+    """
+    instrs = template.instructions
+    slots = [None] * (len(instrs) + 1)
+    slots[0] = 0
+    pending = [0]
+    while pending:
+        pc = pending.pop()
+        count = slots[pc]
+        instr = instrs[pc]
+        opcode = instr.opcode
+        if opcode == OpCode.STORE:
+            count = max(count, instr.operand + 1)
+        if opcode == OpCode.JMP:
+            targets = [instr.operand]
+        elif opcode == OpCode.JMPF:
+            targets = [pc + 1, instr.operand]
+        elif opcode == OpCode.RET:
+            targets = []
+        else:
+            targets = [pc + 1]
+        for target in targets:
+            if target < len(instrs) and (slots[target] is None or count < slots[target]):
+                slots[target] = count
+                pending.append(target)
+    return slots
+
+
+def inline_calls(template, templates, max_size):
+    """Inline the calls of small functions in a template.
+
+    Returns: The number of calls inlined.
+
+    """
+    instrs = template.instructions
+    slots = defined_slots(template)
+    new_instrs = []
+    positions = []              # source position of each new instruction
+    new_pcs = []                # old pc -> new pc
+    jumps = []                  # copied jumps of the template
+    inlined = 0
+    for pc, instr in enumerate(instrs):
+        new_pcs.append(len(new_instrs))
+        callee = templates.get(instr.operand) if instr.opcode == OpCode.CALL else None
+        if callee is None or callee is template or slots[pc] is None \
+           or not inlinable(callee, max_size):
+            copy = VMInstr(instr.opcode, instr.operand, instr.comment)
+            if instr.opcode in (OpCode.JMP, OpCode.JMPF):
+                jumps.append(copy)
+            new_instrs.append(copy)
+            positions.append(template.position(pc))
+            continue
+        inline_body(callee, slots[pc], new_instrs, positions)
+        inlined += 1
+    new_pcs.append(len(new_instrs))
+    for jump in jumps:
+        jump.operand = new_pcs[jump.operand]
+    template.instructions = new_instrs
+    template.line_table = line_table(positions)
+    return inlined
+
+
+def inline_body(callee, base, instrs, positions):
+    """Append a copy of a callee's instructions to instrs, with its
+    variables starting at slot base and its returns jumping past the
+    copy (leaving the return value on the stack).
+
+    """
+    body = callee.instructions
+    n = callee.arg_count
+    start = len(instrs)
+    # the arguments are on the stack with the last one on top, so the
+    # nth parameter is stored first
+    def slot(s):
+        return base + n - 1 - s if s < n else base + s
+    # a final return just falls through
+    end = start + len(body) - (1 if body[-1].opcode == OpCode.RET else 0)
+    for pc, instr in enumerate(body[:end - start]):
+        operand = instr.operand
+        opcode = instr.opcode
+        if pc < n:
+            operand = base + pc
+        elif opcode in (OpCode.LOAD, OpCode.STORE):
+            operand = slot(operand)
+        elif opcode in (OpCode.JMP, OpCode.JMPF):
+            operand = start + operand
+        elif opcode == OpCode.RET:
+            opcode, operand = OpCode.JMP, end
+        instrs.append(VMInstr(opcode, operand, instr.comment))
+        positions.append(callee.position(pc))
+
+
+def line_table(positions):
+    """Returns the line table for instructions with the given source
+    positions.
+
+    """
+    table = []
+    for pc, position in enumerate(positions):
+        if position is not None and (not table or table[-1][1:] != position):
+            table.append((pc,) + position)
+    return table
+
+
+def reachable_templates(templates):
+    """Returns the names of the templates main can reach through calls."""
+    seen = {'main'}
+    pending = ['main']
+    while pending:
+        template = templates.get(pending.pop())
+        if template is None:
+            continue
+        for instr in template.instructions:
+            if instr.opcode == OpCode.CALL and instr.operand not in seen:
+                seen.add(instr.operand)
+                pending.append(instr.operand)
+    return seen
+
+
+def inline_functions(vm, level=1):
+    """Inline calls of small functions in the program loaded in a VM,
+    and drop the functions that are no longer called.
+
+    Args:
+        vm -- The VM loaded with the program's frame templates.
+        level -- Optimization level (see INLINE_SIZES).
+
+    Returns: The number of calls inlined.
+
+    """
+    max_size = INLINE_SIZES.get(level, INLINE_SIZES[max(INLINE_SIZES)])
+    if not max_size:
+        return 0
+    templates = vm.frame_templates
+    total = 0
+    for _ in range(INLINE_ROUNDS):
+        inlined = sum(inline_calls(t, templates, max_size) for t in templates.values()
+                      if t.generate is None)
+        if not inlined:
+            break
+        total += inlined
+    live = reachable_templates(templates)
+    for name in list(templates):
+        if name not in live:
+            del templates[name]
+    vm.decoded = {}
+    return total
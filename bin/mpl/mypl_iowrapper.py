@@ -23,6 +23,10 @@ class StdInWrapper:
             return ''
         return self.stream.peek(1).decode('utf-8')[0]
 
+    def read_all(self):
+        """Returns and removes the rest of the stream as a string."""
+        return self.stream.read().decode('utf-8')
+
     def close(self):
         """Closes the stream."""
         pass # nothing to do
@@ -46,6 +50,10 @@ class FileWrapper:
         self.stream.seek(loc)
         return ch
 
+    def read_all(self):
+        """Returns and removes the rest of the stream as a string."""
+        return self.stream.read()
+
     def close(self):
         """Closes the stream."""
         self.stream.close()
@@ -0,0 +1,85 @@
+"""Machine-readable metrics for a MyPL run.
+
+The metrics for one run of bin/mypl (the VM's counters, the time of
+each compile phase, and the exit status) are written as a JSON object
+or in the Prometheus text exposition format, for the node exporter's
+textfile collector.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import json
+import os
+
+
+# metric name -> (Prometheus type, help text)
+METRICS = {
+    'instructions': ('counter', 'VM instructions executed'),
+    'calls': ('counter', 'Function calls made'),
+    'max_call_depth': ('gauge', 'Peak call stack depth'),
+    'structs_allocated': ('counter', 'Struct objects allocated'),
+    'arrays_allocated': ('counter', 'Array objects allocated'),
+    'heap_objects': ('gauge', 'Peak number of heap objects'),
+    'heap_array_elements': ('gauge', 'Peak number of array elements on the heap'),
+    'memo_hits': ('counter', 'Pure function calls answered from the memo cache'),
+    'memo_misses': ('counter', 'Pure function calls run and added to the memo cache'),
+    'cache_hit': ('gauge', 'Whether the compiled program came from the cache'),
+    'run_seconds': ('gauge', 'Time spent running the program'),
+    'exit_status': ('gauge', 'Exit status of the run'),
+}
+
+
+def run_metrics(vm, phases, run_seconds, status, cache_hit=False):
+    """Returns the metrics for a run as a dictionary.
+
+    Args:
+        vm -- The VM the program ran in (None if it failed to compile).
+        phases -- (phase name, seconds, peak bytes) for each compile
+                  phase, as recorded by PhaseTimings.
+        run_seconds -- Time spent running the program.
+        status -- The run's exit status.
+        cache_hit -- Whether the compiled program came from the cache.
+
+    """
+    metrics = vm.metrics() if vm is not None else {}
+    metrics['cache_hit'] = int(cache_hit)
+    metrics['run_seconds'] = run_seconds
+    metrics['exit_status'] = status
+    metrics['phase_seconds'] = {name: seconds for name, seconds, _ in phases}
+    return metrics
+
+
+def prometheus(metrics, prefix='mypl_'):
+    """Returns the metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        if name in metrics:
+            metric = prefix + name + ('_total' if kind == 'counter' else '')
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.append(f'{metric} {metrics[name]}')
+    if metrics.get('phase_seconds'):
+        lines.append(f'# HELP {prefix}phase_seconds Time spent in each compile phase')
+        lines.append(f'# TYPE {prefix}phase_seconds gauge')
+        for phase, seconds in metrics['phase_seconds'].items():
+            lines.append(f'{prefix}phase_seconds{{phase="{phase}"}} {seconds}')
+    return ''.join(line + '\n' for line in lines)
+
+
+def write_metrics(path, metrics, format='json'):
+    """Write the metrics to a file ('json' or 'prometheus' format). The
+    file is replaced in one step, so a collector reading it never sees
+    a partly written file.
+
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if format == 'prometheus':
+            f.write(prometheus(metrics))
+        else:
+            json.dump(metrics, f, indent=2)
+            f.write('\n')
+    os.replace(tmp_path, path)
@@ -60,3 +60,18 @@ OpCode = Enum('OpCode', [
     'DUP',     # pop x, push x, push x
     'NOP'      # do nothing
 ])
+
+
+# net change in operand stack size for each opcode (CALL and RET are
+# handled separately)
+STACK_EFFECTS = {
+    OpCode.PUSH: 1, OpCode.POP: -1, OpCode.LOAD: 1, OpCode.STORE: -1,
+    OpCode.ADD: -1, OpCode.SUB: -1, OpCode.MUL: -1, OpCode.DIV: -1,
+    OpCode.CMPLT: -1, OpCode.CMPLE: -1, OpCode.CMPEQ: -1, OpCode.CMPNE: -1,
+    OpCode.AND: -1, OpCode.OR: -1, OpCode.NOT: 0,
+    OpCode.JMP: 0, OpCode.JMPF: -1,
+    OpCode.WRITE: -1, OpCode.READ: 1, OpCode.LEN: 0, OpCode.GETC: -1,
+    OpCode.TOINT: 0, OpCode.TODBL: 0, OpCode.TOSTR: 0,
+    OpCode.ALLOCS: 1, OpCode.SETF: -2, OpCode.GETF: 0, OpCode.ALLOCA: 0,
+    OpCode.SETI: -3, OpCode.GETI: -1, OpCode.DUP: 1, OpCode.NOP: 0,
+}
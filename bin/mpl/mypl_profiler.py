@@ -0,0 +1,181 @@
+"""Execution profiler for the MyPL VM.
+
+The VM's profiling run loop counts every executed instruction by
+function and offset and tells the profiler about each call and return.
+Opcode and per-function instruction counts are derived from the
+per-offset counts when the report is made, so the run loop only does
+one increment per instruction.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import time
+
+
+class FunctionStats:
+    """Call count and wall times (in seconds) for one function."""
+
+    __slots__ = ('name', 'calls', 'instructions', 'self_time', 'cum_time')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.instructions = 0
+        self.self_time = 0.0   # time spent executing the function itself
+        self.cum_time = 0.0    # time including the functions it calls
+
+
+class Profiler:
+    """Collects instruction counts and function timings for a VM run."""
+
+    def __init__(self, clock=time.perf_counter):
+        """Create a profiler.
+
+        Args:
+            clock -- Function returning the current time in seconds.
+
+        """
+        self.clock = clock
+        self.offset_counts = {}    # frame template -> count per instruction
+        self.functions = {}        # function name -> FunctionStats
+        self.stack = []            # (FunctionStats, call time) per active call
+        self.active = {}           # function name -> number of active calls
+        self.start_time = None
+        self.last_time = None      # time of the last call or return
+        self.total_time = 0.0
+
+
+    def counts(self, template):
+        """Returns the list of per-instruction counts for a template."""
+        counts = self.offset_counts.get(template)
+        if counts is None:
+            counts = [0] * len(template.instructions)
+            self.offset_counts[template] = counts
+        return counts
+
+
+    def start(self):
+        """Record the start of the run."""
+        self.start_time = self.last_time = self.clock()
+
+
+    def call(self, template):
+        """Record a call to the template's function."""
+        now = self.clock()
+        if self.stack:
+            self.stack[-1][0].self_time += now - self.last_time
+        self.last_time = now
+        name = template.function_name
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = FunctionStats(name)
+        stats.calls += 1
+        self.active[name] = self.active.get(name, 0) + 1
+        self.stack.append((stats, now))
+
+
+    def ret(self):
+        """Record a return from the current function."""
+        now = self.clock()
+        stats, call_time = self.stack.pop()
+        stats.self_time += now - self.last_time
+        self.last_time = now
+        # recursive calls are only timed once, by the outermost call
+        self.active[stats.name] -= 1
+        if not self.active[stats.name]:
+            stats.cum_time += now - call_time
+
+
+    def stop(self):
+        """Record the end of the run, closing any calls still active
+        (e.g., when the program ends with an error).
+
+        """
+        while self.stack:
+            self.ret()
+        self.total_time = self.clock() - self.start_time
+        for template, counts in self.offset_counts.items():
+            self.functions[template.function_name].instructions = sum(counts)
+
+
+    #----------------------------------------------------------------------
+    # Reports
+    #----------------------------------------------------------------------
+
+    def instruction_count(self):
+        """Returns the total number of instructions executed."""
+        return sum(sum(counts) for counts in self.offset_counts.values())
+
+
+    def opcode_counts(self):
+        """Returns a dictionary from opcode name to execution count."""
+        totals = {}
+        for template, counts in self.offset_counts.items():
+            for instr, count in zip(template.instructions, counts):
+                if count:
+                    name = instr.opcode.name
+                    totals[name] = totals.get(name, 0) + count
+        return totals
+
+
+    def hot_instructions(self, top=10):
+        """Returns the top most executed instructions as a list of
+        (function name, offset, instruction, count) tuples.
+
+        """
+        rows = []
+        for template, counts in self.offset_counts.items():
+            for pc, count in enumerate(counts):
+                if count:
+                    rows.append((template.function_name, pc,
+                                 template.instructions[pc], count))
+        rows.sort(key=lambda row: -row[3])
+        return rows[:top]
+
+
+    def line_counts(self):
+        """Returns a dictionary from (function name, source line) to the
+        number of instructions executed for that line.
+
+        """
+        totals = {}
+        for template, counts in self.offset_counts.items():
+            for pc, count in enumerate(counts):
+                if count:
+                    position = template.position(pc)
+                    key = (template.function_name, position[0] if position else None)
+                    totals[key] = totals.get(key, 0) + count
+        return totals
+
+
+    def report(self, top=10):
+        """Returns the profile as a printable string."""
+        total = self.instruction_count() or 1
+        lines = [f'Profile: {self.instruction_count()} instructions '
+                 f'in {self.total_time * 1000:.3f} ms', '']
+        lines.append(f'{"function":24} {"calls":>8} {"instrs":>10} '
+                     f'{"self ms":>10} {"cum ms":>10}')
+        functions = sorted(self.functions.values(), key=lambda f: -f.self_time)
+        for f in functions:
+            lines.append(f'{f.name:24} {f.calls:8} {f.instructions:10} '
+                         f'{f.self_time * 1000:10.3f} {f.cum_time * 1000:10.3f}')
+        lines.append('')
+        lines.append(f'{"opcode":24} {"count":>8} {"%":>10}')
+        opcodes = sorted(self.opcode_counts().items(), key=lambda item: -item[1])
+        for name, count in opcodes:
+            lines.append(f'{name:24} {count:8} {count / total * 100:10.1f}')
+        lines.append('')
+        lines.append(f'{"hot line":48} {"count":>8}')
+        hot_lines = sorted(self.line_counts().items(), key=lambda item: -item[1])
+        for (name, line), count in hot_lines[:top]:
+            where = f'{name} line {line}'
+            lines.append(f'{where:48} {count:8}')
+        lines.append('')
+        lines.append(f'{"hot instruction":48} {"count":>8}')
+        for name, pc, instr, count in self.hot_instructions(top):
+            where = f'{name} {pc}: {instr}'
+            lines.append(f'{where:48} {count:8}')
+        return '\n'.join(lines)
@@ -0,0 +1,93 @@
+"""Purity analysis of checked MyPL programs.
+
+A function is pure if its result depends only on its arguments and
+calling it has no effect besides returning the result, so that a call
+can be answered with the result of an earlier call with the same
+arguments. Here that means a function that:
+
+    takes and returns only primitive (non-array) values,
+    never allocates or writes to the heap,
+    calls no built-in that does I/O, and
+    calls only pure functions (recursion included).
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+from mpl.mypl_ast import *
+from mpl.mypl_builtins import BASE_TYPES, IO_OPCODES
+from mpl.mypl_call_graph import CallGraph
+
+
+class PurityAnalysis (CallGraph):
+    """Visitor building the call graph of a checked program, along with
+    the functions that are impure in themselves (whatever they call).
+
+    """
+
+    def __init__(self):
+        super().__init__()
+        # ids of the functions that are impure in themselves
+        self.impure = set()
+        # id of the function being visited
+        self.curr_fun_id = None
+
+
+    def pure_functions(self):
+        """Returns the ids of the pure functions."""
+        pure = set(self.calls) - self.impure
+        # drop callers of impure functions until none are left
+        changed = True
+        while changed:
+            changed = False
+            for fun_id in list(pure):
+                if not self.calls[fun_id] <= pure:
+                    pure.discard(fun_id)
+                    changed = True
+        return pure
+
+
+    def primitive(self, data_type):
+        """Returns true if a data type is a non-array base type."""
+        return not data_type.is_array and data_type.type_name.lexeme in BASE_TYPES
+
+    # Visitor Functions
+
+    def visit_fun_def(self, fun_def):
+        self.curr_fun_id = fun_def.fun_id
+        if not self.primitive(fun_def.return_type) or \
+           not all(self.primitive(param.data_type) for param in fun_def.params):
+            self.impure.add(fun_def.fun_id)
+        super().visit_fun_def(fun_def)
+
+    def visit_assign_stmt(self, assign_stmt):
+        lvalue = assign_stmt.lvalue
+        if len(lvalue) > 1 or lvalue[-1].array_expr:
+            self.impure.add(self.curr_fun_id)
+        super().visit_assign_stmt(assign_stmt)
+
+    def visit_call_expr(self, call_expr):
+        if call_expr.builtin is not None and call_expr.builtin.opcode in IO_OPCODES:
+            self.impure.add(self.curr_fun_id)
+        super().visit_call_expr(call_expr)
+
+    def visit_new_rvalue(self, new_rvalue):
+        self.impure.add(self.curr_fun_id)
+        super().visit_new_rvalue(new_rvalue)
+
+
+def mark_pure_functions(program):
+    """Set the pure flag of each function definition of a checked
+    program.
+
+    Returns: The number of pure functions.
+
+    """
+    analysis = PurityAnalysis()
+    program.accept(analysis)
+    pure = analysis.pure_functions()
+    for fun_def in program.fun_defs:
+        fun_def.pure = fun_def.fun_id in pure
+    return len(pure)
@@ -0,0 +1,153 @@
+"""Sampling profiler for the MyPL VM.
+
+A background thread snapshots the VM's call stack on a timer while the
+program runs in the VM's normal (uninstrumented) run loop, so long
+runs can be profiled at low overhead. Samples can be written as
+collapsed stacks (for flamegraph.pl, speedscope, and similar tools) or
+as Chrome trace-event JSON (for chrome://tracing and Perfetto).
+
+The sampling thread has to take the GIL from the running program, so
+the effective sample rate is bounded by sys.getswitchinterval() (5 ms
+by default) no matter how short the interval is.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import json
+import threading
+import time
+
+
+class Sampler:
+    """Samples a VM's call stack at a fixed interval."""
+
+    def __init__(self, vm, interval=0.001, clock=time.perf_counter):
+        """Create a sampler for the given VM.
+
+        Args:
+            vm -- The VM to sample.
+            interval -- Seconds between samples.
+            clock -- Function returning the current time in seconds.
+
+        """
+        self.vm = vm
+        self.interval = interval
+        self.clock = clock
+        self.samples = []          # (seconds since start, ((template, pc), ...))
+        self.start_time = None
+        self.stop_time = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self.start_time = self.clock()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.sample_loop, daemon=True)
+        self.thread.start()
+
+
+    def stop(self):
+        """Stop sampling."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.stop_time = self.clock()
+
+
+    def sample_loop(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+
+    def sample(self):
+        """Record a snapshot of the VM's call stack (outermost first)."""
+        # copy the stack first, since the VM keeps running while we read it
+        frames = list(self.vm.call_stack)
+        if frames:
+            stack = tuple((frame.template, max(frame.pc - 1, 0)) for frame in frames)
+            self.samples.append((self.clock() - self.start_time, stack))
+
+
+    #----------------------------------------------------------------------
+    # Output formats
+    #----------------------------------------------------------------------
+
+    def collapsed(self, offsets=False, lines=False):
+        """Returns the samples as collapsed stacks, one "f;g;h count" line
+        per distinct stack.
+
+        Args:
+            offsets -- Include the instruction offset with each function
+                       (as function:offset).
+            lines -- Include the source line with each function (as
+                     "function (line n)").
+
+        """
+        def frame_name(template, pc):
+            name = template.function_name
+            if offsets:
+                name += f':{pc}'
+            if lines:
+                position = template.position(pc)
+                name += f' (line {position[0] if position else "?"})'
+            return name
+        counts = {}
+        for _, stack in self.samples:
+            key = ';'.join(frame_name(template, pc) for template, pc in stack)
+            counts[key] = counts.get(key, 0) + 1
+        return ''.join(f'{key} {count}\n' for key, count in sorted(counts.items()))
+
+
+    def chrome_trace(self):
+        """Returns the samples as a Chrome trace-event object, with a
+        begin/end event pair for each stretch of samples in which a
+        call was on the stack.
+
+        """
+        events = []
+        def event(phase, name, seconds):
+            events.append({'name': name, 'ph': phase, 'ts': round(seconds * 1e6, 3),
+                           'pid': 1, 'tid': 1})
+        active = []
+        for seconds, stack in self.samples:
+            names = [template.function_name for template, _ in stack]
+            common = 0
+            while common < min(len(active), len(names)) and active[common] == names[common]:
+                common += 1
+            for name in reversed(active[common:]):
+                event('E', name, seconds)
+            for name in names[common:]:
+                event('B', name, seconds)
+            active = names
+        end = (self.stop_time - self.start_time) if self.stop_time else \
+            (self.samples[-1][0] if self.samples else 0)
+        for name in reversed(active):
+            event('E', name, end)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+    def write(self, path, format='collapsed'):
+        """Write the samples to a file in the given format ('collapsed' or
+        'chrome'). Collapsed stacks include source lines.
+
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            if format == 'chrome':
+                json.dump(self.chrome_trace(), f)
+            else:
+                f.write(self.collapsed(lines=True))
@@ -11,22 +11,36 @@ from mpl.mypl_error import *
 from mpl.mypl_token import Token, TokenType
 from mpl.mypl_ast import *
 from mpl.mypl_symbol_table import SymbolTable
+from mpl.mypl_builtins import BASE_TYPES, BUILTINS, length_builtin
 
+# built-in return types, shared by every call (checking never mutates them)
+RETURN_TYPES = {name: DataType(False, Token(token_type, name, 1, 1)) for name, token_type in
+                [('int', TokenType.INT_TYPE), ('double', TokenType.DOUBLE_TYPE),
+                 ('bool', TokenType.BOOL_TYPE), ('string', TokenType.STRING_TYPE),
+                 ('void', TokenType.VOID_TYPE)]}
 
-BASE_TYPES = ['int', 'double', 'bool', 'string']
-#modified to be function ids insted of names
-BUILT_INS = ['print_string','print_int','print_double','print_bool', 'input', 'itos_int', 'itod_int', 'dtos_double', 'dtoi_double', 'stoi_string', 'stod_string',
-            'get_int_string']
-#needed for the length built in
-length_types = ['length_intarray', 'length_doublearray', 'length_stringarray', 'length_boolarray','length_string']
 class SemanticChecker(Visitor):
     """Visitor implementation to semantically check MyPL programs."""
 
-    def __init__(self):
+    def __init__(self, check_bodies=True):
+        """Create a checker.
+
+        Args:
+            check_bodies -- Check function bodies along with the rest of
+                            the program. If False, only the struct
+                            definitions and function signatures are
+                            checked, and each function must be checked
+                            with check_function before its code is
+                            generated.
+
+        """
+        self.check_bodies = check_bodies
         self.structs = {}
         self.functions = {}
         self.symbol_table = SymbolTable()
         self.curr_type = None
+        # built-ins plus the length functions of the program's structs
+        self.builtins = dict(BUILTINS)
 
 
     # Helper Functions
@@ -67,6 +81,31 @@ class SemanticChecker(Visitor):
                 id += 'array'
         return id
 
+
+    def check_function(self, fun_def):
+        """Check the body of one function of a program whose signatures
+        have been checked.
+
+        """
+        # start from an empty table, in case an earlier check failed
+        # part way through a function
+        self.symbol_table = SymbolTable()
+        fun_def.accept(self)
+
+
+    def check_path_indexes(self, path):
+        """Check the array index expressions of all but the last element
+        of a variable path (so the variables in them are resolved too).
+
+        """
+        curr_type = self.curr_type
+        for var_ref in path[:-1]:
+            if var_ref.array_expr:
+                var_ref.array_expr.accept(self)
+                if self.curr_type.type_name.lexeme != 'int':
+                    self.error('invalid array iterator', self.curr_type.type_name)
+        self.curr_type = curr_type
+
         
     # Visitor Functions
     
@@ -77,14 +116,16 @@ class SemanticChecker(Visitor):
             if struct_name in self.structs:
                 self.error(f'duplicate {struct_name} definition', struct.struct_name)
             self.structs[struct_name] = struct
-            length_types.append('length_'+ struct_name +'array')
+            builtin = length_builtin(struct_name)
+            self.builtins[builtin.fun_id] = builtin
         # check and record function defs
         for fun in program.fun_defs:
             #fun_name = fun.fun_name.lexeme
             id = self.get_fun_id(fun)
+            fun.fun_id = id
             if id in self.functions: 
                 self.error(f'duplicate {id} definition', fun.fun_name)
-            if id in BUILT_INS or id in length_types:
+            if id in self.builtins:
                 self.error(f'redefining built-in function', fun.fun_name)
             if id == 'main' and fun.return_type.type_name.lexeme != 'void':
                 self.error('main without void type', fun.return_type.type_name)
@@ -98,8 +139,9 @@ class SemanticChecker(Visitor):
         for struct in self.structs.values():
             struct.accept(self)
         # check each function
-        for fun in self.functions.values():
-            fun.accept(self)
+        if self.check_bodies:
+            for fun in self.functions.values():
+                fun.accept(self)
         
         
     def visit_struct_def(self, struct_def):
@@ -115,7 +157,7 @@ class SemanticChecker(Visitor):
     def visit_fun_def(self, fun_def):
         self.symbol_table.push_environment()
         fun_def.return_type.accept(self)
-        self.symbol_table.add('return', self.curr_type)
+        self.symbol_table.add('return', VarDef(self.curr_type, fun_def.fun_name))
         for param in fun_def.params:
             param.accept(self)
         for stmt in fun_def.stmts:
@@ -125,7 +167,7 @@ class SemanticChecker(Visitor):
         
     def visit_return_stmt(self, return_stmt):
         return_stmt.expr.accept(self)
-        if self.curr_type.type_name.lexeme != 'void' and self.curr_type.type_name.lexeme != self.symbol_table.get('return').type_name.lexeme:
+        if self.curr_type.type_name.lexeme != 'void' and self.curr_type.type_name.lexeme != self.symbol_table.get('return').data_type.type_name.lexeme:
             self.error('Static Error: return type does not match function return', self.curr_type.type_name)
 
             
@@ -141,12 +183,14 @@ class SemanticChecker(Visitor):
     def visit_assign_stmt(self, assign_stmt):
         if not self.symbol_table.exists(assign_stmt.lvalue[0].var_name.lexeme):
             self.error("use before def",self.curr_type.type_name)
-        lvalue_type = self.symbol_table.get(assign_stmt.lvalue[0].var_name.lexeme)
+        var_def = self.symbol_table.get(assign_stmt.lvalue[0].var_name.lexeme)
+        assign_stmt.lvalue[0].slot = var_def.slot
+        lvalue_type = var_def.data_type
         i = 0
         if len(assign_stmt.lvalue) > 1:
-            if self.symbol_table.get(assign_stmt.lvalue[i].var_name.lexeme).type_name.lexeme not in self.structs:
+            if var_def.data_type.type_name.lexeme not in self.structs:
                 self.error('struct not defined', self.curr_type.type_name)
-            struct_def = self.structs[self.symbol_table.get(assign_stmt.lvalue[i].var_name.lexeme).type_name.lexeme]    
+            struct_def = self.structs[var_def.data_type.type_name.lexeme]
             while i < len(assign_stmt.lvalue) - 1:
                 struct_fields = []
                 for j in struct_def.fields:
@@ -159,12 +203,13 @@ class SemanticChecker(Visitor):
                         self.error('array not indexed', self.curr_type.type_name)
                     struct_def = self.structs[self.get_field_type(struct_def,assign_stmt.lvalue[i+1].var_name.lexeme).type_name.lexeme]
                 i = i+1
+        self.check_path_indexes(assign_stmt.lvalue)
         if assign_stmt.lvalue[-1].array_expr:
             assign_stmt.lvalue[-1].array_expr.accept(self)
             if self.curr_type.type_name.lexeme != 'int':
                 self.error('invalid array iterator', self.curr_type.type_name)
             if len(assign_stmt.lvalue) == 1:
-                array_type = self.symbol_table.get(assign_stmt.lvalue[-1].var_name.lexeme)
+                array_type = var_def.data_type
             else:
                 array_type = self.get_field_type(struct_def, assign_stmt.lvalue[-1].var_name.lexeme)
             lvalue_type = DataType(False, array_type.type_name)
@@ -221,96 +266,35 @@ class SemanticChecker(Visitor):
 
     def visit_call_expr(self, call_expr):
         id = call_expr.fun_name.lexeme
+        # each argument is checked once; its type is reused below
+        arg_types = []
         for arg in call_expr.args:
             arg.accept(self)
+            arg_types.append(self.curr_type)
             id += '_'
             id += self.curr_type.type_name.lexeme
             if self.curr_type.is_array:
                 id += 'array'
         call_expr.fun_id = id
-        if id not in self.functions and id not in BUILT_INS and id not in length_types:
+        builtin = self.builtins.get(id)
+        if id not in self.functions and builtin is None:
             self.error('function not defined', self.curr_type.type_name)
-        if id in self.functions and (id in BUILT_INS or id in length_types):
+        if id in self.functions and builtin is not None:
             self.error('Built in function double defined', self.curr_type.type_name)
-        if id in self.functions:
-            fun_def = self.functions[id]
-            if len(fun_def.params) != len(call_expr.args):
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            for i in range(len(fun_def.params)):
-                call_expr.args[i].accept(self)
-                if fun_def.params[i].data_type.type_name.lexeme != self.curr_type.type_name.lexeme and self.curr_type.type_name.lexeme != 'void':
-                    self.error('Invlaid paramater type', call_expr.fun_name)
-            self.curr_type = fun_def.return_type
-        elif(id == 'print_string' or id == 'print_int' or id == 'print_double' or id == 'print_bool'):
-            if len(call_expr.args) != 1:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            call_expr.args[0].accept(self)
-            if self.curr_type.type_name.lexeme not in BASE_TYPES or self.curr_type.is_array:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-        elif(id == 'input'):
-            if len(call_expr.args) != 0:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            self.curr_type = DataType(False,Token(TokenType.STRING_TYPE,'string',1,1))
-        elif(id == 'itos_int'):
-            if len(call_expr.args) != 1:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            call_expr.args[0].accept(self)
-            if self.curr_type.type_name.lexeme != 'int' or self.curr_type.is_array:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-            self.curr_type = DataType(False,Token(TokenType.STRING_TYPE,'string',1,1))
-        elif(id == 'itod_int'):
-            if len(call_expr.args) != 1:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            call_expr.args[0].accept(self)
-            if self.curr_type.type_name.lexeme != 'int' or self.curr_type.is_array:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-            self.curr_type = DataType(False,Token(TokenType.DOUBLE_TYPE,'double',1,1))
-        elif(id == 'dtos_double'):
-            if len(call_expr.args) != 1:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            call_expr.args[0].accept(self)
-            if self.curr_type.type_name.lexeme != 'double' or self.curr_type.is_array:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-            self.curr_type = DataType(False,Token(TokenType.STRING_TYPE,'string',1,1))
-        elif(id == 'dtoi_double'):
-            if len(call_expr.args) != 1:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            call_expr.args[0].accept(self)
-            if self.curr_type.type_name.lexeme != 'double' or self.curr_type.is_array:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-            self.curr_type = DataType(False,Token(TokenType.INT_TYPE,'int',1,1))
-        elif(id == 'stoi_string'):
-            if len(call_expr.args) != 1:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            call_expr.args[0].accept(self)
-            if self.curr_type.type_name.lexeme != 'string' or self.curr_type.is_array:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-            self.curr_type = DataType(False,Token(TokenType.INT_TYPE,'int',1,1))
-        elif(id == 'stod_string'):
-            if len(call_expr.args) != 1:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            call_expr.args[0].accept(self)
-            if self.curr_type.type_name.lexeme != 'string' or self.curr_type.is_array:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-            self.curr_type = DataType(False,Token(TokenType.DOUBLE_TYPE,'double',1,1))
-        elif(id in length_types):
-            if len(call_expr.args) != 1:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            call_expr.args[0].accept(self)
-            if self.curr_type.type_name.lexeme != 'string' and self.curr_type.is_array == False:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-            self.curr_type = DataType(False,Token(TokenType.INT_TYPE,'int',1,1))
-        elif(id == 'get_int_string'):
-            if len(call_expr.args) != 2:
-                self.error('Invalid number of function params', self.curr_type.type_name)
-            call_expr.args[0].accept(self)
-            if self.curr_type.type_name.lexeme != 'int' or self.curr_type.is_array:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-            call_expr.args[1].accept(self)
-            if self.curr_type.type_name.lexeme != 'string' or self.curr_type.is_array:
-                self.error('Invalid paramater type', self.curr_type.type_name)
-            self.curr_type = DataType(False,Token(TokenType.STRING_TYPE,'string',1,1))
-        
+        if builtin is not None:
+            # the id encodes the parameter types, so the arguments match
+            call_expr.builtin = builtin
+            self.curr_type = RETURN_TYPES[builtin.return_type]
+            return
+        fun_def = self.functions[id]
+        if len(fun_def.params) != len(call_expr.args):
+            self.error('Invalid number of function params', self.curr_type.type_name)
+        for i in range(len(fun_def.params)):
+            self.curr_type = arg_types[i]
+            if fun_def.params[i].data_type.type_name.lexeme != self.curr_type.type_name.lexeme and self.curr_type.type_name.lexeme != 'void':
+                self.error('Invlaid paramater type', call_expr.fun_name)
+        self.curr_type = fun_def.return_type
+
 
     def visit_expr(self, expr):
         expr.first.accept(self)
@@ -366,7 +350,10 @@ class SemanticChecker(Visitor):
         if self.symbol_table.exists_in_curr_env(var_name):
             self.error(f'duplicate {var_name} definition', var_def.var_name)
         else:
-            self.symbol_table.add(var_def.var_name.lexeme, self.curr_type)
+            # the variable's offset in its function frame is the number
+            # of variables already in scope (not counting 'return')
+            var_def.slot = sum(len(env) for env in self.symbol_table.environments) - 1
+            self.symbol_table.add(var_def.var_name.lexeme, var_def)
         
 
         
@@ -420,12 +407,14 @@ class SemanticChecker(Visitor):
     def visit_var_rvalue(self, var_rvalue):
         if not self.symbol_table.exists(var_rvalue.path[0].var_name.lexeme):
             self.error("use before def",self.curr_type.type_name)
-        self.curr_type = self.symbol_table.get(var_rvalue.path[0].var_name.lexeme)
+        var_def = self.symbol_table.get(var_rvalue.path[0].var_name.lexeme)
+        var_rvalue.path[0].slot = var_def.slot
+        self.curr_type = var_def.data_type
         i = 0
         if len(var_rvalue.path) > 1:
-            if self.symbol_table.get(var_rvalue.path[i].var_name.lexeme).type_name.lexeme not in self.structs:
+            if var_def.data_type.type_name.lexeme not in self.structs:
                 self.error('struct not defined',self.curr_type.type_name)
-            struct_def = self.structs[self.symbol_table.get(var_rvalue.path[i].var_name.lexeme).type_name.lexeme]    
+            struct_def = self.structs[var_def.data_type.type_name.lexeme]
             while i < len(var_rvalue.path) - 1:
                 struct_fields = []
                 for j in struct_def.fields:
@@ -438,12 +427,13 @@ class SemanticChecker(Visitor):
                         self.error('array not indexed', self.curr_type.type_name)
                     struct_def = self.structs[self.get_field_type(struct_def,var_rvalue.path[i+1].var_name.lexeme).type_name.lexeme]
                 i = i+1
+        self.check_path_indexes(var_rvalue.path)
         if  var_rvalue.path[-1].array_expr:
             var_rvalue.path[-1].array_expr.accept(self)
             if self.curr_type.type_name.lexeme != 'int':
                 self.error('invalid array iterator', self.curr_type.type_name)
             if len(var_rvalue.path) == 1:
-                array_type = self.symbol_table.get(var_rvalue.path[-1].var_name.lexeme)
+                array_type = var_def.data_type
             else:
                 array_type = self.get_field_type(struct_def, var_rvalue.path[-1].var_name.lexeme)
             self.curr_type = DataType(False, array_type.type_name)
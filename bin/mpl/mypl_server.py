@@ -0,0 +1,193 @@
+"""Persistent MyPL compile server.
+
+The server keeps the interpreter and compiled programs warm and runs
+each request in a fresh VM with its own input and output streams. See
+mypl_client for the protocol.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+from collections import OrderedDict
+
+from mpl.mypl_error import MyPLError
+from mpl.mypl_compiler import compile
+from mpl.mypl_cache import cache_key
+
+
+# seconds a program may run when the server is given no timeout, so a
+# program that never ends can't hold a server thread forever
+DEFAULT_TIMEOUT = 10.0
+
+
+class ProgramCache:
+    """Bounded least-recently-used cache of compiled programs."""
+
+    def __init__(self, max_size):
+        """Create an empty cache holding at most max_size programs."""
+        self.max_size = max_size
+        self.programs = OrderedDict()
+
+
+    def __len__(self):
+        """Returns the number of cached programs."""
+        return len(self.programs)
+
+
+    def get(self, key):
+        """Returns the program for key (marking it as recently used), or
+        None if it is not cached.
+
+        """
+        program = self.programs.get(key)
+        if program is not None:
+            self.programs.move_to_end(key)
+        return program
+
+
+    def put(self, key, program):
+        """Add a program to the cache, evicting the least recently used
+        program if the cache is full.
+
+        """
+        self.programs[key] = program
+        self.programs.move_to_end(key)
+        while len(self.programs) > self.max_size:
+            self.programs.popitem(last=False)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Handles one client request per connection."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            check_request(request)
+        except ValueError as ex:
+            stdout, status = f'ERROR: Bad request: {ex}\n', 1
+        else:
+            stdout, status = self.server.run(request)
+        reply = {'stdout': stdout, 'status': status}
+        self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+
+def check_request(request):
+    """Raises ValueError if a decoded request is not a request object
+    with a string "source" or "path" (and string "stdin", if given).
+
+    """
+    if not isinstance(request, dict):
+        raise ValueError('expecting a JSON object')
+    if not isinstance(request.get('source', request.get('path')), str):
+        raise ValueError('expecting a "source" or "path" string')
+    if not isinstance(request.get('stdin', ''), str):
+        raise ValueError('expecting a "stdin" string')
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server that compiles and runs mypl programs, each
+    request in its own thread.
+
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, cache_size=64, limits=None):
+        """Create a server listening on socket_path.
+
+        Args:
+            socket_path -- The Unix domain socket path to listen on.
+            cache_size -- Max number of compiled programs to keep.
+            limits -- Execution limits for each run, as keyword arguments
+                      to VM.set_limits (default: a DEFAULT_TIMEOUT timeout).
+
+        """
+        remove_stale_socket(socket_path)
+        self.socket_path = socket_path
+        self.programs = ProgramCache(cache_size)
+        self.programs_lock = threading.Lock()
+        self.limits = limits if limits is not None else {'timeout': DEFAULT_TIMEOUT}
+        super().__init__(socket_path, RequestHandler)
+
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+    def compile(self, source):
+        """Returns the CompiledProgram for the given source,
+        compiling it only if it is not already cached.
+
+        """
+        key = cache_key(source)
+        with self.programs_lock:
+            program = self.programs.get(key)
+        if program is None:
+            program = compile(source)
+            with self.programs_lock:
+                self.programs.put(key, program)
+        return program
+
+
+    def run(self, request):
+        """Compile and run the requested program.
+
+        Returns: The (stdout, exit status) of the program.
+
+        """
+        if 'source' in request:
+            source = request['source']
+        else:
+            try:
+                with open(request['path'], 'r', encoding='utf-8') as f:
+                    source = f.read()
+            except OSError:
+                return f"ERROR: Could not open file '{request['path']}'\n", 1
+        out = io.StringIO()
+        status = 0
+        try:
+            self.compile(source).run(request.get('stdin', ''), out, self.limits)
+        except MyPLError as ex:
+            out.write(f'{ex}\n')
+            status = 1
+        except Exception as ex:
+            out.write(f'ERROR: {type(ex).__name__}: {ex}\n')
+            status = 1
+        return out.getvalue(), status
+
+
+def remove_stale_socket(socket_path):
+    """Remove a socket file left behind by a server that is no longer
+    running. Raises OSError if a server is still listening on it.
+
+    """
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)
+            return
+    raise OSError(f"a server is already listening on '{socket_path}'")
+
+
+def serve(socket_path, cache_size=64, limits=None):
+    """Run the compile server until interrupted (SIGINT or SIGTERM)."""
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with CompileServer(socket_path, cache_size, limits) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
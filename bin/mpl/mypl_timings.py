@@ -0,0 +1,195 @@
+"""Phase timings for the MyPL compile pipeline.
+
+Runs each stage of the pipeline (lexing, parsing, semantic checking,
+dead function elimination, purity analysis, code generation, and
+execution) on its own, recording the wall time and peak memory of
+each, along with a few size counts. Lexing is done up front into a
+TokenStore so that the parser's time does not include the lexer's.
+
+Memory is measured with tracemalloc, which slows down allocation-heavy
+code, so the times are best compared with one another rather than
+with a normal run.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import dataclasses
+import time
+import tracemalloc
+
+from mpl.mypl_opcode import OpCode, STACK_EFFECTS
+
+
+def max_stack_depth(template, frame_templates):
+    """Returns the largest operand stack size reached by any path through
+    a frame template's instructions, going around each loop once. (The
+    results of calls made as statements are never popped, so in a loop
+    containing one the stack keeps growing past this size.)
+
+    Args:
+        template -- The frame template to analyze.
+        frame_templates -- All of the program's templates, by name (for
+                           the argument counts of called functions).
+
+    """
+    instrs = template.instructions
+    depths = {}
+    pending = [(0, template.arg_count)]
+    while pending:
+        pc, depth = pending.pop()
+        # each instruction is only visited with the depth of the first
+        # path to reach it
+        while pc < len(instrs) and pc not in depths:
+            depths[pc] = depth
+            instr = instrs[pc]
+            opcode = instr.opcode
+            if opcode == OpCode.RET:
+                break
+            if opcode == OpCode.CALL:
+                callee = frame_templates.get(instr.operand)
+                depth += 1 - (callee.arg_count if callee else 0)
+            else:
+                depth += STACK_EFFECTS.get(opcode, 0)
+            if opcode == OpCode.JMP:
+                pc = instr.operand
+                continue
+            if opcode == OpCode.JMPF:
+                pending.append((instr.operand, depth))
+            pc += 1
+    # DUP is the only instruction that pushes more than it leaves
+    peak = [d + 1 if instrs[pc].opcode == OpCode.DUP else d for pc, d in depths.items()]
+    return max(peak, default=template.arg_count)
+
+
+def count_nodes(node):
+    """Returns the number of AST nodes in the tree rooted at node (tokens
+    are not counted).
+
+    """
+    count = 1
+    for field in dataclasses.fields(node):
+        value = getattr(node, field.name)
+        children = value if isinstance(value, list) else [value]
+        for child in children:
+            if dataclasses.is_dataclass(child) and not hasattr(child, 'token_type'):
+                count += count_nodes(child)
+    return count
+
+
+class PhaseTimings:
+    """Wall time and peak memory for each phase of a run."""
+
+    def __init__(self, clock=time.perf_counter, memory=True):
+        """Create an empty set of timings.
+
+        Args:
+            clock -- Function returning the current time in seconds.
+            memory -- Record peak memory use (with tracemalloc).
+
+        """
+        self.clock = clock
+        self.memory = memory
+        self.phases = []    # (name, seconds, peak bytes) in run order
+        self.counts = {}    # name -> count
+
+
+    def measure(self, name, fun, *args):
+        """Call fun(*args), recording its wall time and peak memory use
+        (above what was allocated beforehand) as the named phase.
+
+        Returns: The result of the call.
+
+        """
+        if not self.memory:
+            start = self.clock()
+            try:
+                return fun(*args)
+            finally:
+                self.phases.append((name, self.clock() - start, 0))
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = self.clock()
+        try:
+            return fun(*args)
+        finally:
+            seconds = self.clock() - start
+            peak = tracemalloc.get_traced_memory()[1] - base
+            if not tracing:
+                tracemalloc.stop()
+            self.phases.append((name, seconds, peak))
+
+
+    def report(self):
+        """Returns the timings as a printable string."""
+        total = sum(seconds for _, seconds, _ in self.phases)
+        lines = [f'{"phase":16} {"ms":>10} {"%":>6} {"peak KiB":>10}']
+        for name, seconds, peak in self.phases:
+            percent = seconds / total * 100 if total else 0.0
+            lines.append(f'{name:16} {seconds * 1000:10.3f} {percent:6.1f} '
+                         f'{peak / 1024:10.1f}')
+        lines.append(f'{"total":16} {total * 1000:10.3f}')
+        lines.append('')
+        for name, count in self.counts.items():
+            lines.append(f'{name:24} {count:>10}')
+        return '\n'.join(lines)
+
+
+def compile_timed(source, timings, opt_level=0):
+    """Compile a mypl program one phase at a time, recording each phase
+    and the program's counts in timings.
+
+    Args:
+        source -- The text of the mypl program.
+        timings -- The PhaseTimings to record in.
+        opt_level -- Optimization level (see compile_source).
+
+    Returns: A VM loaded with the program's frame templates.
+
+    """
+    from mpl.mypl_token_store import TokenStore
+    from mpl.mypl_ast_parser import ASTParser
+    from mpl.mypl_semantic_checker import SemanticChecker
+    from mpl.mypl_call_graph import eliminate_dead_functions
+    from mpl.mypl_purity import mark_pure_functions
+    from mpl.mypl_code_gen import CodeGenerator
+    from mpl.mypl_inliner import inline_functions
+    from mpl.mypl_vm import VM
+    tokens = timings.measure('lex', TokenStore, source)
+    timings.counts['tokens'] = len(tokens)
+    ast = timings.measure('parse', ASTParser(tokens).parse)
+    timings.counts['ast nodes'] = count_nodes(ast)
+    timings.measure('check', ast.accept, SemanticChecker())
+    timings.counts['functions dropped'] = timings.measure('prune', eliminate_dead_functions, ast)
+    timings.counts['pure functions'] = timings.measure('purity', mark_pure_functions, ast)
+    vm = VM()
+    timings.measure('codegen', ast.accept, CodeGenerator(vm))
+    if opt_level:
+        timings.counts['calls inlined'] = timings.measure('inline', inline_functions,
+                                                          vm, opt_level)
+    templates = vm.frame_templates
+    timings.counts['functions'] = len(templates)
+    timings.counts['instructions'] = sum(len(t.instructions) for t in templates.values())
+    timings.counts['max stack depth'] = max(
+        (max_stack_depth(t, templates) for t in templates.values()), default=0)
+    return vm
+
+
+def run_timed(source, timings, opt_level=0):
+    """Compile and run a mypl program one phase at a time, recording each
+    phase and the program's counts in timings. Execution is recorded
+    even if the program fails.
+
+    Args:
+        source -- The text of the mypl program.
+        timings -- The PhaseTimings to record in.
+        opt_level -- Optimization level (see compile_source).
+
+    """
+    vm = compile_timed(source, timings, opt_level)
+    timings.measure('execute', vm.run)
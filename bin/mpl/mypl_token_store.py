@@ -0,0 +1,106 @@
+"""Compact token storage for large MyPL programs.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import io
+from array import array
+
+from mpl.mypl_token import Token, TokenType
+from mpl.mypl_lexer import Lexer
+from mpl.mypl_iowrapper import FileWrapper
+
+
+# token types indexed by their enum value
+TOKEN_TYPES = [None] + list(TokenType)
+
+
+class TokenStore:
+    """Struct-of-arrays token stream over a program's source text.
+
+    Instead of keeping one Token object per lexeme, the store keeps
+    parallel arrays of token type codes, start offsets, lengths, lines,
+    and columns. Lexemes are sliced out of the source text only when a
+    token is requested. The store provides the same next_token()
+    interface as the Lexer so it can be handed directly to ASTParser.
+
+    """
+
+    def __init__(self, source):
+        """Lex the given source text into the store.
+
+        Args:
+            source -- The text of a mypl program.
+
+        """
+        self.source = source
+        self.types = array('i')
+        self.starts = array('i')
+        self.lengths = array('i')
+        self.lines = array('i')
+        self.columns = array('i')
+        self.pos = 0
+        self.tokenize()
+
+
+    def __len__(self):
+        """Returns the number of tokens (including EOS) in the store."""
+        return len(self.types)
+
+
+    def tokenize(self):
+        """Run the lexer over the source text, recording each token."""
+        line_starts = array('i', [0])
+        i = self.source.find('\n')
+        while i != -1:
+            line_starts.append(i + 1)
+            i = self.source.find('\n', i + 1)
+        lexer = Lexer(FileWrapper(io.StringIO(self.source)))
+        while True:
+            t = lexer.next_token()
+            start = line_starts[t.line - 1] + t.column - 1
+            # string and comment lexemes omit their delimiters
+            if t.token_type == TokenType.STRING_VAL:
+                start += 1
+            elif t.token_type == TokenType.COMMENT:
+                start += 2
+            self.types.append(t.token_type.value)
+            self.starts.append(start)
+            self.lengths.append(len(t.lexeme))
+            self.lines.append(t.line)
+            self.columns.append(t.column)
+            if t.token_type == TokenType.EOS:
+                break
+
+
+    def token_type(self, i):
+        """Returns the token type of the i-th token."""
+        return TOKEN_TYPES[self.types[i]]
+
+
+    def lexeme(self, i):
+        """Returns the lexeme of the i-th token."""
+        start = self.starts[i]
+        return self.source[start:start + self.lengths[i]]
+
+
+    def token(self, i):
+        """Returns the i-th token as a Token object."""
+        return Token(TOKEN_TYPES[self.types[i]], self.lexeme(i),
+                     self.lines[i], self.columns[i])
+
+
+    def reset(self):
+        """Moves back to the first token in the store."""
+        self.pos = 0
+
+
+    def next_token(self):
+        """Return the next token in the store (EOS once exhausted)."""
+        i = self.pos
+        if i < len(self.types) - 1:
+            self.pos += 1
+        return self.token(i)
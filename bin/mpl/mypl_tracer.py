@@ -0,0 +1,116 @@
+"""Tracing hooks for the MyPL VM.
+
+A tracer is passed to VM.run(), which then executes the program in an
+instrumented run loop that calls the tracer's hooks. The normal run
+loop has no hooks, so tracing costs nothing unless it is used.
+
+NAME: Caleb Lefcort
+DATE: Fall 2026
+CLASS: CPSC 334
+
+"""
+
+import json
+
+
+class Tracer:
+    """Base tracer whose hooks do nothing. Subclasses override the hooks
+    for the events they are interested in.
+
+    """
+
+    def start(self, vm):
+        """Called before the first instruction executes."""
+        pass
+
+    def instruction(self, frame, instr):
+        """Called before each instruction executes (frame.pc has already
+        moved past it).
+
+        """
+        pass
+
+    def call(self, frame):
+        """Called when a new frame is pushed (including main's)."""
+        pass
+
+    def ret(self, frame):
+        """Called after frame returns and is popped."""
+        pass
+
+    def alloc(self, frame, oid, kind, size):
+        """Called after a struct or array object is allocated.
+
+        Args:
+            frame -- The frame that allocated it.
+            oid -- The new object's id.
+            kind -- Either 'struct' or 'array'.
+            size -- The number of array elements (0 for structs).
+
+        """
+        pass
+
+    def stop(self):
+        """Called when the run ends, normally or with an error."""
+        pass
+
+
+class DebugTracer(Tracer):
+    """Prints the state of the VM before each instruction."""
+
+    def start(self, vm):
+        self.call_stack = vm.call_stack
+
+    def instruction(self, frame, instr):
+        print('\n')
+        print('\t FRAME.........:', frame.template.function_name)
+        print('\t PC............:', frame.pc)
+        print('\t INSTRUCTION...:', instr)
+        val = None if not frame.operand_stack else frame.operand_stack[-1]
+        print('\t NEXT OPERAND..:', val)
+        cs = self.call_stack
+        fun = cs[-1].template.function_name if cs else None
+        print('\t NEXT FUNCTION..:', fun)
+
+
+class JsonTracer(Tracer):
+    """Writes one JSON array per event to a text stream:
+
+        ["i", function, offset, opcode, operand]   instruction
+        ["c", function, depth]                     call
+        ["r", function, depth]                     return
+        ["a", kind, oid, size]                     allocation
+
+    where depth is the call stack depth after the event.
+
+    """
+
+    def __init__(self, stream):
+        """Create a tracer writing to the given text stream."""
+        self.stream = stream
+        self.encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    def start(self, vm):
+        self.call_stack = vm.call_stack
+
+    def write(self, event):
+        self.stream.write(self.encode(event) + '\n')
+
+    def instruction(self, frame, instr):
+        operand = instr.operand
+        if not isinstance(operand, (int, float, str, bool, type(None))):
+            operand = str(operand)
+        self.write(['i', frame.template.function_name, frame.pc - 1,
+                    instr.opcode.name, operand])
+
+    def call(self, frame):
+        self.write(['c', frame.template.function_name, len(self.call_stack)])
+
+    def ret(self, frame):
+        self.write(['r', frame.template.function_name, len(self.call_stack)])
+
+    def alloc(self, frame, oid, kind, size):
+        self.write(['a', kind, oid, size])
+
+    def stop(self):
+        self.stream.flush()
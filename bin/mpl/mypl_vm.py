@@ -6,29 +6,94 @@ CLASS: CPSC 326
 
 """
 
+import sys
+import time
+from collections import OrderedDict
+
 from mpl.mypl_error import *
 from mpl.mypl_opcode import *
 from mpl.mypl_frame import *
 
 
+# number of characters of output buffered before it is written out
+OUTPUT_BUFFER_SIZE = 64 * 1024
+
+# instructions executed between checks of the instruction budget and
+# the clock, when limits are set
+LIMIT_CHECK_INTERVAL = 10000
+
+# default max number of pure call results kept when memoizing
+MEMO_SIZE = 10000
+
+
 class VM:
 
-    def __init__(self):
-        """Creates a VM."""
+    def __init__(self, stdin=None, stdout=None, buffer_size=OUTPUT_BUFFER_SIZE):
+        """Creates a VM.
+
+        Args:
+            stdin -- Text stream (or any object with readline) read by
+                     READ (default: standard input).
+            stdout -- Text stream written by WRITE (default: standard output).
+            buffer_size -- Characters of output to buffer before writing
+                           to stdout (0 writes on every WRITE).
+
+        """
+        self.stdin = stdin
+        self.stdout = stdout
+        self.input = None            # line reader, set up on first READ
+        self.buffer_size = buffer_size
+        self.out_buffer = []         # pending output strings
+        self.out_size = 0            # number of characters pending
         self.struct_heap = {}        # id -> dict
         self.array_heap = {}         # id -> list
         self.next_obj_id = 2024      # next available object id (int)
         self.frame_templates = {}    # function name -> VMFrameTemplate
+        self.linked = False          # CALL targets resolved (see link)
+        self.struct_fields = {}      # struct name -> field names
         self.call_stack = []         # function call stack
+        self.decoded = {}            # frame template -> instruction handlers
+        # run counters, updated only on jumps, calls, and returns
+        self.executed = 0            # instructions executed
+        self.segment_start = 0       # pc where the current run of
+                                     # straight-line instructions began
+        self.calls = 0               # CALL instructions executed
+        self.max_depth = 0           # peak call stack depth
+        self.start_time = None       # when the run started
+        # execution limits (see set_limits)
+        self.handlers = HANDLERS     # opcode -> handler
+        self.max_instructions = float('inf')
+        self.max_heap_objects = float('inf')
+        self.max_call_depth = float('inf')
+        self.timeout = None
+        self.deadline = None         # clock time the run must end by
+        self.next_check = 0          # instruction count of the next check
+        self.heap_size = 0           # heap objects (and array elements)
+        self.limited = False         # whether any limit is set
+        # memoization of pure calls (see set_memoize)
+        self.memo = None             # (template, args) -> result, in LRU order
+        self.memo_size = MEMO_SIZE
+        self.memo_pending = []       # (frame, key) of each pure call running
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.call_handler = VM.op_call  # CALL handler used on a miss
 
     
     def __repr__(self):
-        """Returns a string representation of frame templates."""
+        """Returns a string representation of frame templates, with the
+        source line of each run of instructions in the left column.
+
+        """
         s = ''
         for name, template in self.frame_templates.items():
             s += f'\nFrame {name}\n'
+            starts = {pc: line for pc, line, _ in template.line_table}
+            last_line = None
             for i in range(len(template.instructions)):
-                s += f'  {i}: {template.instructions[i]}\n'
+                line = starts.get(i, last_line)
+                shown = line if line != last_line else ''
+                last_line = line
+                s += f'{shown:>5} {i:>4}: {template.instructions[i]}\n'
         return s
 
     
@@ -40,324 +105,714 @@ class VM:
 
         """
         self.frame_templates[template.function_name] = template
+        self.linked = False
+
+
+    def link(self):
+        """Resolve the template called by each CALL instruction, so calls
+        don't look functions up by name as they run. Called before a run
+        if it hasn't been since templates were added.
+
+        """
+        for template in self.frame_templates.values():
+            self.link_template(template)
+        self.linked = True
+
+
+    def link_template(self, template):
+        """Resolve the templates called by one template's CALL
+        instructions.
+
+        """
+        for pc, instr in enumerate(template.instructions):
+            if instr.opcode == OpCode.CALL:
+                target = self.frame_templates.get(instr.operand)
+                if target is None:
+                    self.error(f'No "{instr.operand}" function', VMFrame(template, pc + 1))
+                instr.target = target
+
+
+    def add_struct_fields(self, struct_name, field_names):
+        """Record the field names of a struct type.
+
+        Args:
+            struct_name -- The name of the struct type.
+            field_names -- The struct's field names, in order.
+
+        """
+        self.struct_fields[struct_name] = field_names
 
     
     def error(self, msg, frame=None):
-        """Report a VM error."""
+        """Report a VM error, with the location of the instruction being
+        executed in frame (default: the current frame).
+
+        """
+        if frame is None and self.call_stack:
+            frame = self.call_stack[-1]
         if not frame:
             raise VMError(msg)
         pc = frame.pc - 1
         instr = frame.template.instructions[pc]
         name = frame.template.function_name
+        position = frame.template.position(pc)
+        if position:
+            msg += f' near line {position[0]}, column {position[1]}'
         msg += f' (in {name} at {pc}: {instr})'
         raise VMError(msg)
 
+
+    def open_input(self):
+        """Set up the line reader used by READ."""
+        # sys.stdin is looked up here (not at import) so callers can swap it
+        self.input = sys.stdin if self.stdin is None else self.stdin
+
+
+    def set_limits(self, max_instructions=None, max_heap_objects=None,
+                   max_call_depth=None, timeout=None):
+        """Limit the resources a run may use, for running untrusted
+        programs. A run that goes over a limit ends with a VMError.
+
+        Limits are enforced by the handlers of the instructions that
+        can make a run go on indefinitely (taken jumps and calls) or
+        grow the heap, so programs run without limits pay nothing for
+        them. The instruction budget and timeout are only checked every
+        LIMIT_CHECK_INTERVAL instructions.
+
+        Args:
+            max_instructions -- Max instructions executed.
+            max_heap_objects -- Max heap size, counting each struct and
+                                array, and each array element, as an object.
+            max_call_depth -- Max call stack depth.
+            timeout -- Max wall-clock seconds for the run.
+
+        """
+        inf = float('inf')
+        self.max_instructions = inf if max_instructions is None else max_instructions
+        self.max_heap_objects = inf if max_heap_objects is None else max_heap_objects
+        self.max_call_depth = inf if max_call_depth is None else max_call_depth
+        self.timeout = timeout
+        limits = (max_instructions, max_heap_objects, max_call_depth, timeout)
+        self.limited = limits != (None,) * 4
+        self.update_handlers()
+
+
+    def set_memoize(self, max_entries=MEMO_SIZE):
+        """Cache the results of calls of pure functions (see mypl_purity),
+        keyed on the function and its arguments, so that repeated calls
+        return without running the function again. The least recently
+        used results are dropped past max_entries. Hits and misses are
+        counted in the run's metrics.
+
+        Args:
+            max_entries -- Max results kept, or None to stop memoizing.
+
+        """
+        self.memo = None if max_entries is None else OrderedDict()
+        self.memo_size = max_entries
+        self.update_handlers()
+
+
+    def update_handlers(self):
+        """Select the handlers for the limits and memoization set."""
+        handlers = LIMITED_HANDLERS if self.limited else HANDLERS
+        if self.memo is not None:
+            self.call_handler = handlers[OpCode.CALL]
+            handlers = dict(handlers)
+            handlers.update(MEMO_HANDLERS)
+        self.handlers = handlers
+        self.decoded = {}
+
+
+    def check_limits(self, frame):
+        """Check the instruction budget and the clock, and schedule the
+        next check.
+
+        """
+        if self.executed > self.max_instructions:
+            self.limit_error('instruction limit exceeded', frame)
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            self.limit_error('time limit exceeded', frame)
+        self.next_check = min(self.executed + LIMIT_CHECK_INTERVAL,
+                              self.max_instructions + 1)
+
+
+    def limit_error(self, msg, frame):
+        """Report that a run went over a limit, with its usage so far."""
+        seconds = time.perf_counter() - self.start_time
+        self.error(f'{msg} ({self.executed} instructions, call depth '
+                   f'{len(self.call_stack)}, {self.heap_size} heap objects, '
+                   f'{seconds:.3f} s)', frame)
+
+
+    def metrics(self):
+        """Returns a dictionary of counts for the run so far. Objects are
+        never freed, so the heap sizes are also the peak sizes.
+
+        """
+        return {
+            'instructions': self.executed,
+            'calls': self.calls,
+            'max_call_depth': self.max_depth,
+            'structs_allocated': len(self.struct_heap),
+            'arrays_allocated': len(self.array_heap),
+            'heap_objects': len(self.struct_heap) + len(self.array_heap),
+            'heap_array_elements': sum(len(a) for a in self.array_heap.values()),
+            **({} if self.memo is None else {'memo_hits': self.memo_hits,
+                                             'memo_misses': self.memo_misses}),
+        }
+
+
+    def flush_output(self):
+        """Write any buffered output to stdout."""
+        if self.out_buffer:
+            stdout = sys.stdout if self.stdout is None else self.stdout
+            stdout.write(''.join(self.out_buffer))
+            stdout.flush()
+            self.out_buffer.clear()
+            self.out_size = 0
+
     
     #----------------------------------------------------------------------
     # RUN FUNCTION
     #----------------------------------------------------------------------
     
-    def run(self, debug=False):
-        """Run the virtual machine."""
+    def run(self, debug=False, profiler=None, tracer=None):
+        """Run the virtual machine. Output is buffered and written when the
+        buffer fills, before reading input, and when the program ends
+        (normally or with an error).
+
+        Args:
+            debug -- Print each instruction before it executes.
+            profiler -- A Profiler to record the run in (optional).
+            tracer -- A Tracer whose hooks are called as the program
+                      runs (optional).
 
+        """
+        if debug:
+            from mpl.mypl_tracer import DebugTracer
+            tracer = DebugTracer()
+            # debug output goes straight to standard output, so don't
+            # buffer program output around it
+            self.buffer_size = 0
         # grab the "main" function frame and instantiate it
         if not 'main' in self.frame_templates:
             self.error('No "main" functrion')
+        if not self.linked:
+            self.link()
         frame = VMFrame(self.frame_templates['main'])
         self.call_stack.append(frame)
+        self.max_depth = max(self.max_depth, 1)
+        self.start_time = time.perf_counter()
+        if self.timeout is not None:
+            self.deadline = self.start_time + self.timeout
+        try:
+            # the plain loop has no per-instruction checks, so tracing
+            # and profiling use their own loops
+            if tracer is not None:
+                self.run_traced(frame, tracer)
+            elif profiler is not None:
+                self.run_profiled(frame, profiler)
+            else:
+                self.run_plain(frame)
+        finally:
+            # count the current frame's last straight-line run (if the
+            # program didn't end with main's RET)
+            if self.call_stack:
+                self.executed += self.call_stack[-1].pc - self.segment_start
+                self.segment_start = self.call_stack[-1].pc
+            self.flush_output()
+
+
+    def decode(self, template):
+        """Returns the handler for each instruction of a frame template,
+        generating the template's code first if that was put off until
+        it was called.
+
+        """
+        handlers = self.decoded.get(template)
+        if handlers is None:
+            if template.generate is not None:
+                template.generate()
+            handlers = [self.handlers.get(instr.opcode, VM.op_unsupported)
+                        for instr in template.instructions]
+            self.decoded[template] = handlers
+        return handlers
+
+
+    def run_plain(self, frame):
+        """Run loop (continue until run out of call frames or instructions).
 
-        # run loop (continue until run out of call frames or instructions)
-        while self.call_stack and frame.pc < len(frame.template.instructions):
-            # get the next instruction
-            instr = frame.template.instructions[frame.pc]
-            # increment the program count (pc)
-            frame.pc += 1
-            # for debugging:
-            if debug:
-                print('\n')
-                print('\t FRAME.........:', frame.template.function_name)
-                print('\t PC............:', frame.pc)
-                print('\t INSTRUCTION...:', instr)
-                val = None if not frame.operand_stack else frame.operand_stack[-1]
-                print('\t NEXT OPERAND..:', val)
-                cs = self.call_stack
-                fun = cs[-1].template.function_name if cs else None
-                print('\t NEXT FUNCTION..:', fun)
-
-            #------------------------------------------------------------
-            # Literals and Variables
-            #------------------------------------------------------------
-
-            if instr.opcode == OpCode.PUSH:
-                frame.operand_stack.append(instr.operand)
-
-            elif instr.opcode == OpCode.POP:
-                frame.operand_stack.pop()
-                
-
-            # TODO: Fill in rest of ops
-
-            
-            #------------------------------------------------------------
-            # Operations
-            #------------------------------------------------------------
-            elif instr.opcode == OpCode.STORE:
-                if len(frame.variables) == instr.operand:
-                    frame.variables.append(frame.operand_stack.pop())
-                else:
-                    frame.variables[instr.operand] = frame.operand_stack.pop()
-
-            elif instr.opcode == OpCode.LOAD:
-                frame.operand_stack.append(frame.variables[instr.operand])
-
-            elif instr.opcode == OpCode.ADD:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y):
-                    self.error("add type mismatch")
-                frame.operand_stack.append(y + x)
-
-            elif instr.opcode == OpCode.SUB:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y):
-                    self.error("add type mismatch")
-                frame.operand_stack.append(y - x)
-
-            elif instr.opcode == OpCode.MUL:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y):
-                    self.error("add type mismatch")
-                frame.operand_stack.append(y * x)
-
-            elif instr.opcode == OpCode.DIV:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y):
-                    self.error("add type mismatch")
-                if x == 0:
-                    self.error("divison by zero")
-                if type(x) == int:
-                    frame.operand_stack.append(y // x)
-                else:
-                    frame.operand_stack.append(y / x)
-
-            elif instr.opcode == OpCode.AND:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y):
-                    self.error("add type mismatch")
-                frame.operand_stack.append(y and x)
-
-            elif instr.opcode == OpCode.OR:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y):
-                    self.error("add type mismatch")
-                frame.operand_stack.append(y or x)
-            
-            elif instr.opcode == OpCode.NOT:
-                x = frame.operand_stack.pop()
-                if type(x) != bool:
-                    self.error("not non boolean")
-                frame.operand_stack.append(not x)
-
-            elif instr.opcode == OpCode.CMPLT:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y):
-                    self.error("add type mismatch")
-                frame.operand_stack.append(y < x)
-
-            elif instr.opcode == OpCode.CMPLE:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y):
-                    self.error("add type mismatch")
-                frame.operand_stack.append(y <= x)
-
-            elif instr.opcode == OpCode.CMPEQ:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y) and (x != None and y != None):
-                    self.error("add type mismatch")
-                frame.operand_stack.append(y == x)
-
-            elif instr.opcode == OpCode.CMPNE:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if type(x) != type(y) and (x != None and y != None):
-                    self.error("add type mismatch")
-                frame.operand_stack.append(y != x)
-            
-
-
-            # TODO: Fill in rest of ops
-            
-
-            #------------------------------------------------------------
-            # Branching
-            #------------------------------------------------------------
-            elif instr.opcode == OpCode.JMP:
-                frame.pc = instr.operand
-
-            elif instr.opcode == OpCode.JMPF:
-                if(not frame.operand_stack.pop()):
-                    frame.pc = instr.operand
-
-            # TODO: Fill in rest of ops
-            
-                    
-            #------------------------------------------------------------
-            # Functions
-            #------------------------------------------------------------
-            elif instr.opcode == OpCode.CALL:
-                if not instr.operand in self.frame_templates:
-                    self.error(f'No "{instr.operand}" function')
-                new_frame = VMFrame(self.frame_templates[instr.operand])
-                for i in range(new_frame.template.arg_count):
-                    new_frame.operand_stack.append(frame.operand_stack.pop())
-                self.call_stack.append(new_frame)
+        Each instruction's handler executes it and returns the new
+        current frame if it changed the call stack (CALL and RET).
+
+        """
+        call_stack = self.call_stack
+        handlers = self.decode(frame.template)
+        instrs = frame.template.instructions
+        while call_stack:
+            pc = frame.pc
+            if pc >= len(instrs):
+                break
+            frame.pc = pc + 1
+            new_frame = handlers[pc](self, frame, instrs[pc])
+            if new_frame is not None:
                 frame = new_frame
+                handlers = self.decode(frame.template)
+                instrs = frame.template.instructions
+
+
+    def run_traced(self, frame, tracer):
+        """Run loop that calls the tracer's hooks."""
+        call_stack = self.call_stack
+        tracer.start(self)
+        tracer.call(frame)
+        try:
+            while call_stack:
+                pc = frame.pc
+                handlers = self.decode(frame.template)
+                instrs = frame.template.instructions
+                if pc >= len(instrs):
+                    break
+                frame.pc = pc + 1
+                instr = instrs[pc]
+                tracer.instruction(frame, instr)
+                new_frame = handlers[pc](self, frame, instr)
+                opcode = instr.opcode
+                if opcode == OpCode.CALL:
+                    # a memoized call doesn't make a frame
+                    if new_frame is not None:
+                        tracer.call(new_frame)
+                elif opcode == OpCode.RET:
+                    tracer.ret(frame)
+                elif opcode == OpCode.ALLOCS:
+                    tracer.alloc(frame, frame.operand_stack[-1], 'struct', 0)
+                elif opcode == OpCode.ALLOCA:
+                    oid = frame.operand_stack[-1]
+                    tracer.alloc(frame, oid, 'array', len(self.array_heap[oid]))
+                if new_frame is not None:
+                    frame = new_frame
+        finally:
+            tracer.stop()
+
+
+    def run_profiled(self, frame, profiler):
+        """Run loop that counts each executed instruction and reports
+        calls and returns to the profiler.
 
-            elif instr.opcode == OpCode.RET:
-                return_val = frame.operand_stack.pop()
-                self.call_stack.pop()
-                if self.call_stack:
-                    frame = self.call_stack[-1]
-                    frame.operand_stack.append(return_val)
-            
-
-            # TODO: Fill in rest of ops
-
-            
-            #------------------------------------------------------------
-            # Built-In Functions
-            #------------------------------------------------------------
-
-            # TODO: Fill in rest of ops
-            elif instr.opcode == OpCode.WRITE:
-                x = frame.operand_stack.pop()
-                if x == None:
-                    print('null', end='')
-                else:
-                    if str(x) == "True":
-                        print('true', end='')
-                    elif str(x) == "False":
-                        print('false', end='')
+        """
+        call_stack = self.call_stack
+        profiler.start()
+        profiler.call(frame.template)
+        try:
+            handlers = self.decode(frame.template)
+            instrs = frame.template.instructions
+            counts = profiler.counts(frame.template)
+            while call_stack:
+                pc = frame.pc
+                if pc >= len(instrs):
+                    break
+                frame.pc = pc + 1
+                counts[pc] += 1
+                new_frame = handlers[pc](self, frame, instrs[pc])
+                if new_frame is not None:
+                    if instrs[pc].opcode == OpCode.CALL:
+                        profiler.call(new_frame.template)
                     else:
-                        print(x, end='')
-
-            elif instr.opcode == OpCode.READ:
-                frame.operand_stack.append(input().strip())
-
-            elif instr.opcode == OpCode.LEN:
-                x = frame.operand_stack.pop()
-                if x is None:
-                    self.error("invalid type for len")
-                if type(x) == str:
-                    frame.operand_stack.append(len(x))
-                else:
-                    frame.operand_stack.append(len(self.array_heap[x]))
-
-            elif instr.opcode == OpCode.GETC:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if y == None or x == None or y < 0 or y >= len(x):
-                    self.error("Invalid string index")
-                if type(x) == str:
-                    frame.operand_stack.append(x[y])
-                else:
-                    self.error("invalid type for GETC")
-
-            elif instr.opcode == OpCode.TOINT:
-                val = frame.operand_stack.pop()
-                if val == None:
-                    self.error("invalid literal for TOINT")
-                try:
-                    frame.operand_stack.append(int(val))
-                except:
-                    self.error("invalid literal for TOINT")
-            elif instr.opcode == OpCode.TODBL:
-                val = frame.operand_stack.pop()
-                if val == None:
-                    self.error("invalid literal for TODBL")
-                try:
-                    frame.operand_stack.append(float(val))
-                except:
-                    self.error("invalid literal for TODBL")
-            elif instr.opcode == OpCode.TOSTR:
-                val = frame.operand_stack.pop()
-                if val == None:
-                    self.error("invalid literal for TOSTR")
-                try:
-                    frame.operand_stack.append(str(val))
-                except:
-                    self.error("invalid literal for TOSTR")
-            
-            #------------------------------------------------------------
-            # Heap
-            #------------------------------------------------------------
-            elif instr.opcode == OpCode.ALLOCS:
-                oid = self.next_obj_id
-                self.next_obj_id += 1
-                self.struct_heap[oid] = {}
-                frame.operand_stack.append(oid)
-            
-            elif instr.opcode == OpCode.SETF:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if y == None:
-                    self.error("null field name")
-                self.struct_heap[y][instr.operand] = x
-
-            elif instr.opcode == OpCode.GETF:
-                x = frame.operand_stack.pop()
-                try:
-                    frame.operand_stack.append(self.struct_heap[x][instr.operand])
-                except:
-                    self.error("feild does not exist")
-
-            elif instr.opcode == OpCode.ALLOCA:
-                oid = self.next_obj_id
-                self.next_obj_id += 1
-                array_len = frame.operand_stack.pop()
-                if array_len == None or array_len < 0:
-                    self.error("bad array size")
-                self.array_heap[oid] = [None for _ in range(array_len)]
-                frame.operand_stack.append(oid)
-            
-            elif instr.opcode == OpCode.SETI:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                z = frame.operand_stack.pop()
-                if z == None or y == None or y >= len(self.array_heap[z]) or y < 0:
-                    self.error("bad array oid or index")
-                self.array_heap[z][y] = x
-
-            elif instr.opcode == OpCode.GETI:
-                x = frame.operand_stack.pop()
-                y = frame.operand_stack.pop()
-                if y == None or x == None or x >= len(self.array_heap[y]) or x < 0:
-                    self.error("bad array oid or index")
-                frame.operand_stack.append(self.array_heap[y][x])
-
-            # TODO: Fill in rest of ops
-            
-            
-            #------------------------------------------------------------
-            # Special 
-            #------------------------------------------------------------
-
-            elif instr.opcode == OpCode.DUP:
-                x = frame.operand_stack.pop()
-                frame.operand_stack.append(x)
-                frame.operand_stack.append(x)
-
-            elif instr.opcode == OpCode.NOP:
-                # do nothing
-                pass
+                        profiler.ret()
+                    frame = new_frame
+                    handlers = self.decode(frame.template)
+                    instrs = frame.template.instructions
+                    counts = profiler.counts(frame.template)
+        finally:
+            profiler.stop()
+
+
+    #----------------------------------------------------------------------
+    # INSTRUCTIONS
+    #----------------------------------------------------------------------
 
+    # Each handler executes one instruction in the given frame. Only
+    # CALL and RET return a value: the frame to continue in.
+    #
+    # Executed instructions are counted in runs: each instruction that
+    # moves control elsewhere (a taken jump, a call, or a return) adds
+    # the length of the run that ended with it, so the run loops don't
+    # need a per-instruction counter.
+
+    #------------------------------------------------------------
+    # Literals and Variables
+    #------------------------------------------------------------
+
+    def op_push(self, frame, instr):
+        frame.operand_stack.append(instr.operand)
+
+    def op_pop(self, frame, instr):
+        frame.operand_stack.pop()
+
+    def op_store(self, frame, instr):
+        if len(frame.variables) == instr.operand:
+            frame.variables.append(frame.operand_stack.pop())
+        else:
+            frame.variables[instr.operand] = frame.operand_stack.pop()
+
+    def op_load(self, frame, instr):
+        frame.operand_stack.append(frame.variables[instr.operand])
+
+    #------------------------------------------------------------
+    # Operations
+    #------------------------------------------------------------
+
+    def op_add(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y):
+            self.error("add type mismatch")
+        frame.operand_stack.append(y + x)
+
+    def op_sub(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y):
+            self.error("add type mismatch")
+        frame.operand_stack.append(y - x)
+
+    def op_mul(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y):
+            self.error("add type mismatch")
+        frame.operand_stack.append(y * x)
+
+    def op_div(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y):
+            self.error("add type mismatch")
+        if x == 0:
+            self.error("divison by zero")
+        if type(x) == int:
+            frame.operand_stack.append(y // x)
+        else:
+            frame.operand_stack.append(y / x)
+
+    def op_and(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y):
+            self.error("add type mismatch")
+        frame.operand_stack.append(y and x)
+
+    def op_or(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y):
+            self.error("add type mismatch")
+        frame.operand_stack.append(y or x)
+
+    def op_not(self, frame, instr):
+        x = frame.operand_stack.pop()
+        if type(x) != bool:
+            self.error("not non boolean")
+        frame.operand_stack.append(not x)
+
+    def op_cmplt(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y):
+            self.error("add type mismatch")
+        frame.operand_stack.append(y < x)
+
+    def op_cmple(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y):
+            self.error("add type mismatch")
+        frame.operand_stack.append(y <= x)
+
+    def op_cmpeq(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y) and (x != None and y != None):
+            self.error("add type mismatch")
+        frame.operand_stack.append(y == x)
+
+    def op_cmpne(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if type(x) != type(y) and (x != None and y != None):
+            self.error("add type mismatch")
+        frame.operand_stack.append(y != x)
+
+    #------------------------------------------------------------
+    # Branching
+    #------------------------------------------------------------
+
+    def op_jmp(self, frame, instr):
+        self.executed += frame.pc - self.segment_start
+        frame.pc = self.segment_start = instr.operand
+
+    def op_jmpf(self, frame, instr):
+        if(not frame.operand_stack.pop()):
+            self.executed += frame.pc - self.segment_start
+            frame.pc = self.segment_start = instr.operand
+
+    #------------------------------------------------------------
+    # Functions
+    #------------------------------------------------------------
+
+    def op_call(self, frame, instr):
+        new_frame = VMFrame(instr.target)
+        for i in range(new_frame.template.arg_count):
+            new_frame.operand_stack.append(frame.operand_stack.pop())
+        self.call_stack.append(new_frame)
+        self.executed += frame.pc - self.segment_start
+        self.segment_start = 0
+        self.calls += 1
+        if len(self.call_stack) > self.max_depth:
+            self.max_depth = len(self.call_stack)
+        return new_frame
+
+    def op_ret(self, frame, instr):
+        return_val = frame.operand_stack.pop()
+        self.call_stack.pop()
+        self.executed += frame.pc - self.segment_start
+        if self.call_stack:
+            frame = self.call_stack[-1]
+            self.segment_start = frame.pc
+            frame.operand_stack.append(return_val)
+            return frame
+
+    #------------------------------------------------------------
+    # Built-In Functions
+    #------------------------------------------------------------
+
+    def op_write(self, frame, instr):
+        x = frame.operand_stack.pop()
+        if type(x) is not str:
+            if x is None:
+                x = 'null'
+            elif x is True:
+                x = 'true'
+            elif x is False:
+                x = 'false'
             else:
-                self.error(f'unsupported operation {instr}')
+                x = str(x)
+        self.out_buffer.append(x)
+        self.out_size += len(x)
+        if self.out_size >= self.buffer_size:
+            self.flush_output()
+
+    def op_read(self, frame, instr):
+        if self.input is None:
+            self.open_input()
+        # show any prompt before waiting for input (a program driving
+        # this one over pipes waits for it); this is free when nothing
+        # is buffered
+        self.flush_output()
+        line = self.input.readline()
+        if not line:
+            raise EOFError('EOF when reading a line')
+        frame.operand_stack.append(line.strip())
+
+    def op_len(self, frame, instr):
+        x = frame.operand_stack.pop()
+        if x is None:
+            self.error("invalid type for len")
+        if type(x) == str:
+            frame.operand_stack.append(len(x))
+        else:
+            frame.operand_stack.append(len(self.array_heap[x]))
+
+    def op_getc(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if y == None or x == None or y < 0 or y >= len(x):
+            self.error("Invalid string index")
+        if type(x) == str:
+            frame.operand_stack.append(x[y])
+        else:
+            self.error("invalid type for GETC")
+
+    def op_toint(self, frame, instr):
+        val = frame.operand_stack.pop()
+        if val == None:
+            self.error("invalid literal for TOINT")
+        try:
+            frame.operand_stack.append(int(val))
+        except:
+            self.error("invalid literal for TOINT")
+
+    def op_todbl(self, frame, instr):
+        val = frame.operand_stack.pop()
+        if val == None:
+            self.error("invalid literal for TODBL")
+        try:
+            frame.operand_stack.append(float(val))
+        except:
+            self.error("invalid literal for TODBL")
+
+    def op_tostr(self, frame, instr):
+        val = frame.operand_stack.pop()
+        if val == None:
+            self.error("invalid literal for TOSTR")
+        try:
+            frame.operand_stack.append(str(val))
+        except:
+            self.error("invalid literal for TOSTR")
+
+    #------------------------------------------------------------
+    # Heap
+    #------------------------------------------------------------
+
+    def op_allocs(self, frame, instr):
+        oid = self.next_obj_id
+        self.next_obj_id += 1
+        self.struct_heap[oid] = {}
+        frame.operand_stack.append(oid)
+
+    def op_setf(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if y == None:
+            self.error("null field name")
+        self.struct_heap[y][instr.operand] = x
+
+    def op_getf(self, frame, instr):
+        x = frame.operand_stack.pop()
+        try:
+            frame.operand_stack.append(self.struct_heap[x][instr.operand])
+        except:
+            self.error("feild does not exist")
+
+    def op_alloca(self, frame, instr):
+        oid = self.next_obj_id
+        self.next_obj_id += 1
+        array_len = frame.operand_stack.pop()
+        if array_len == None or array_len < 0:
+            self.error("bad array size")
+        self.array_heap[oid] = [None for _ in range(array_len)]
+        frame.operand_stack.append(oid)
+
+    def op_seti(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        z = frame.operand_stack.pop()
+        if z == None or y == None or y >= len(self.array_heap[z]) or y < 0:
+            self.error("bad array oid or index")
+        self.array_heap[z][y] = x
+
+    def op_geti(self, frame, instr):
+        x = frame.operand_stack.pop()
+        y = frame.operand_stack.pop()
+        if y == None or x == None or x >= len(self.array_heap[y]) or x < 0:
+            self.error("bad array oid or index")
+        frame.operand_stack.append(self.array_heap[y][x])
+
+    #------------------------------------------------------------
+    # Special 
+    #------------------------------------------------------------
+
+    def op_dup(self, frame, instr):
+        x = frame.operand_stack.pop()
+        frame.operand_stack.append(x)
+        frame.operand_stack.append(x)
+
+    def op_nop(self, frame, instr):
+        # do nothing
+        pass
+
+    def op_unsupported(self, frame, instr):
+        self.error(f'unsupported operation {instr}')
+
+    #------------------------------------------------------------
+    # Limited versions (used when limits are set)
+    #------------------------------------------------------------
+
+    def op_jmp_limited(self, frame, instr):
+        # count up to the jump and check before taking it, so that an
+        # error names the jump rather than its target
+        self.executed += frame.pc - self.segment_start
+        self.segment_start = frame.pc
+        if self.executed >= self.next_check:
+            self.check_limits(frame)
+        self.op_jmp(frame, instr)
+
+    def op_jmpf_limited(self, frame, instr):
+        if not frame.operand_stack.pop():
+            self.op_jmp_limited(frame, instr)
+
+    def op_call_limited(self, frame, instr):
+        new_frame = self.op_call(frame, instr)
+        if len(self.call_stack) > self.max_call_depth:
+            self.limit_error('call depth limit exceeded', frame)
+        if self.executed >= self.next_check:
+            self.check_limits(frame)
+        return new_frame
+
+    def op_allocs_limited(self, frame, instr):
+        if self.heap_size + 1 > self.max_heap_objects:
+            self.limit_error('heap limit exceeded', frame)
+        self.op_allocs(frame, instr)
+        self.heap_size += 1
+
+    def op_alloca_limited(self, frame, instr):
+        array_len = frame.operand_stack[-1]
+        # checked before allocating, since one array can be huge
+        if type(array_len) is int and self.heap_size + 1 + array_len > self.max_heap_objects:
+            self.limit_error('heap limit exceeded', frame)
+        self.op_alloca(frame, instr)
+        self.heap_size += 1 + array_len
+
+    #------------------------------------------------------------
+    # Memoizing versions (used when memoizing pure calls)
+    #------------------------------------------------------------
+
+    def op_call_memo(self, frame, instr):
+        target = instr.target
+        if not target.pure:
+            return self.call_handler(self, frame, instr)
+        stack = frame.operand_stack
+        start = len(stack) - target.arg_count
+        key = (target, *stack[start:])
+        memo = self.memo
+        if key in memo:
+            memo.move_to_end(key)
+            self.memo_hits += 1
+            del stack[start:]
+            stack.append(memo[key])
+            return None
+        self.memo_misses += 1
+        new_frame = self.call_handler(self, frame, instr)
+        self.memo_pending.append((new_frame, key))
+        return new_frame
+
+    def op_ret_memo(self, frame, instr):
+        pending = self.memo_pending
+        if pending and pending[-1][0] is frame:
+            memo = self.memo
+            memo[pending.pop()[1]] = frame.operand_stack[-1]
+            if len(memo) > self.memo_size:
+                memo.popitem(last=False)
+        return self.op_ret(frame, instr)
+
+
+# opcode -> the VM method that executes it
+HANDLERS = {opcode: getattr(VM, 'op_' + opcode.name.lower())
+            for opcode in OpCode if hasattr(VM, 'op_' + opcode.name.lower())}
+
+# the handlers used when limits are set
+LIMITED_HANDLERS = dict(HANDLERS)
+LIMITED_HANDLERS.update({
+    OpCode.JMP: VM.op_jmp_limited,
+    OpCode.JMPF: VM.op_jmpf_limited,
+    OpCode.CALL: VM.op_call_limited,
+    OpCode.ALLOCS: VM.op_allocs_limited,
+    OpCode.ALLOCA: VM.op_alloca_limited,
+})
+
+# the handlers replaced when memoizing pure calls
+MEMO_HANDLERS = {
+    OpCode.CALL: VM.op_call_memo,
+    OpCode.RET: VM.op_ret_memo,
+}
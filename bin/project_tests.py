@@ -9,6 +9,13 @@
 
 import pytest
 import io
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
 from mpl.mypl_error import *
 from mpl.mypl_iowrapper import *
 from mpl.mypl_token import *
@@ -19,6 +26,20 @@ from mpl.mypl_code_gen import *
 from mpl.mypl_vm import *
 from mpl.mypl_semantic_checker import *
 from mpl.mypl_symbol_table import *
+from mpl.mypl_token_store import *
+from mpl.mypl_compiler import *
+from mpl.mypl_builtins import *
+from mpl.mypl_profiler import *
+from mpl.mypl_tracer import *
+from mpl.mypl_sampler import *
+from mpl.mypl_timings import *
+from mpl.mypl_metrics import *
+from mpl.mypl_call_graph import *
+from mpl.mypl_inliner import *
+from mpl.mypl_cache import *
+from mpl.mypl_server import *
+from mpl.mypl_client import *
+from mpl.mypl_batch import *
 
 
 #-------------------------------------------------------------------------------
@@ -679,3 +700,1052 @@ def test_bad_get_redef(capsys):
     print(e)
     assert str(e.value).startswith('Static Error:')
 
+
+#-------------------------------------------------------------------------------
+# Token store tests
+#-------------------------------------------------------------------------------
+def test_token_store_matches_lexer():
+    program = (
+        'struct T {int x; string s;}\n'
+        '// a comment\n'
+        'void main() {\n'
+        '  T t = new T(1, "a b\\n");\n'
+        '  double d = 3.25 * 2.0;\n'
+        '  if (t.x >= 1 and not false) {print(t.s);}\n'
+        '}\n'
+    )
+    lexer = Lexer(FileWrapper(io.StringIO(program)))
+    store = TokenStore(program)
+    for i in range(len(store)):
+        assert store.next_token() == lexer.next_token()
+    assert store.token_type(len(store) - 1) == TokenType.EOS
+    assert store.next_token().token_type == TokenType.EOS
+
+def test_token_store_lazy_lexemes():
+    store = TokenStore('void main() {\n  print("hi");\n}')
+    assert store.lexeme(0) == 'void'
+    assert store.lexeme(7) == 'hi'
+    assert store.lines[7] == 2 and store.columns[7] == 9
+    assert store.types.typecode == 'i'
+
+def test_token_store_ast_parser(capsys):
+    program = (
+        'int f(int x) {return x * 2;}\n'
+        'void main() {print(f(21));}\n'
+    )
+    ast = ASTParser(TokenStore(program)).parse()
+    ast.accept(SemanticChecker())
+    vm = VM()
+    ast.accept(CodeGenerator(vm))
+    vm.run()
+    assert capsys.readouterr().out == '42'
+
+#-------------------------------------------------------------------------------
+# Resolved AST tests
+#-------------------------------------------------------------------------------
+def test_checker_resolves_fun_ids_and_slots():
+    program = (
+        'int f(int x, array int ys) {\n'
+        '  int z = x;\n'
+        '  if (z > 0) {int w = z; z = w;}\n'
+        '  int v = 2;\n'
+        '  return z + v;\n'
+        '}\n'
+        'void main() {}\n'
+    )
+    p = ASTParser(Lexer(FileWrapper(io.StringIO(program)))).parse()
+    p.accept(SemanticChecker())
+    f = p.fun_defs[0]
+    assert f.fun_id == 'f_int_intarray'
+    assert p.fun_defs[1].fun_id == 'main'
+    assert [param.slot for param in f.params] == [0, 1]
+    assert f.stmts[0].var_def.slot == 2
+    assert f.stmts[0].expr.first.rvalue.path[0].slot == 0
+    assert f.stmts[1].if_part.stmts[0].var_def.slot == 3
+    assert f.stmts[1].if_part.stmts[1].lvalue[0].slot == 2
+    assert f.stmts[2].var_def.slot == 3
+
+def test_deeply_nested_call_args(capsys):
+    call = '"7"'
+    for i in range(25):
+        call = f'itos(stoi({call}))'
+    build(f'void main() {{print({call});}}').run()
+    assert capsys.readouterr().out == '7'
+
+def test_path_index_variables_resolved(capsys):
+    program = (
+        'struct V {int x; array int ys;}\n'
+        'void main() {\n'
+        '  array V vs = new V[2];\n'
+        '  int i = 1;\n'
+        '  int j = 0;\n'
+        '  vs[i] = new V(5, new int[2]);\n'
+        '  vs[i].ys[j] = 7;\n'
+        '  vs[i].x = vs[i].x + vs[i].ys[j];\n'
+        '  print(vs[i].x);\n'
+        '}\n'
+    )
+    build(program).run()
+    assert capsys.readouterr().out == '12'
+
+#-------------------------------------------------------------------------------
+# Compiled program cache tests
+#-------------------------------------------------------------------------------
+def test_cache_round_trip(capsys, tmp_path):
+    program = (
+        'struct P {int x; double y;}\n'
+        'void main() {\n'
+        '  P p = new P(1, 2.0);\n'
+        '  print(itos(p.x) + " " + dtos(p.y) + " " + dtos(itod(p.x)));\n'
+        '  string s = null; print(s); print(true);\n'
+        '}\n'
+    )
+    key = cache_key(program)
+    assert read_cache(tmp_path, key) is None
+    write_cache(tmp_path, key, compile_source(program))
+    vm = read_cache(tmp_path, key)
+    assert vm.struct_fields == {'P': ['x', 'y']}
+    assert str(vm) == str(compile_source(program))
+    vm.run()
+    assert capsys.readouterr().out == '1 2.0 1.0nulltrue'
+
+def test_cache_key_depends_on_source():
+    assert cache_key('void main() {}') == cache_key('void main() {}')
+    assert cache_key('void main() {}') != cache_key('void main() { }')
+
+def test_cache_ignores_other_formats():
+    artifact = dump(compile_source('void main() {}'))
+    assert load(artifact) is not None
+    artifact['format'] = -1
+    assert load(artifact) is None
+
+#-------------------------------------------------------------------------------
+# Startup tests
+#-------------------------------------------------------------------------------
+def test_cached_run_path_skips_front_end():
+    code = (
+        'import sys\n'
+        'import mpl.mypl_cache, mpl.mypl_vm\n'
+        'print(",".join(m for m in ("dataclasses", "mpl.mypl_ast", "mpl.mypl_lexer")\n'
+        '               if m in sys.modules))\n'
+        'print(mpl.mypl_cache.compiler_version.cache_info().currsize)\n'
+    )
+    bin_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-c', code], cwd=bin_dir,
+                            capture_output=True, text=True, check=True)
+    # nothing loaded or hashed until it is needed
+    assert result.stdout == '\n0\n'
+
+#-------------------------------------------------------------------------------
+# Compile server tests
+#-------------------------------------------------------------------------------
+def test_program_cache_evicts_least_recently_used():
+    cache = ProgramCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+def test_server_round_trip(tmp_path):
+    socket_path = str(tmp_path / 'mypl.sock')
+    program = (
+        'void main() {\n'
+        '  string name = input();\n'
+        '  print("hi " + name);\n'
+        '}\n'
+    )
+    server = CompileServer(socket_path, cache_size=4)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        assert run_program(socket_path, source=program, stdin='ann\n') == ('hi ann', 0)
+        assert run_program(socket_path, source=program, stdin='bob\n') == ('hi bob', 0)
+        assert len(server.programs) == 1
+        out, status = run_program(socket_path, source='void main() {print(1/0);}')
+        assert status == 1 and out.startswith('VM Error:')
+        out, status = run_program(socket_path, path=str(tmp_path / 'missing.mypl'))
+        assert status == 1 and out.startswith('ERROR: Could not open file')
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+    assert not os.path.exists(socket_path)
+
+
+def test_server_limits_and_bad_requests(tmp_path):
+    socket_path = str(tmp_path / 'mypl.sock')
+    server = CompileServer(socket_path, limits={'max_instructions': 1000})
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        # a long run doesn't hold up other requests, and ends at the limit
+        out, status = run_program(socket_path, source='void main() {while (true) {}}')
+        assert status == 1 and 'instruction limit' in out
+        assert run_program(socket_path, source='void main() {print(1);}') == ('1', 0)
+        for request in ([1, 2], {'stdin': ''}, {'source': 1}, {'path': 'x', 'stdin': 2}):
+            reply = send_request(socket_path, request)
+            assert reply['status'] == 1 and reply['stdout'].startswith('ERROR: Bad request:')
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(b'not json\n')
+            reply = json.loads(sock.makefile('rb').readline())
+        assert reply['status'] == 1 and reply['stdout'].startswith('ERROR: Bad request:')
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+
+
+def test_client_rejects_invalid_reply(tmp_path):
+    socket_path = str(tmp_path / 'mypl.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(socket_path)
+        listener.listen(1)
+        def reply_nothing():
+            conn, _ = listener.accept()
+            conn.makefile('rb').readline()
+            conn.close()
+        thread = threading.Thread(target=reply_nothing)
+        thread.start()
+        with pytest.raises(ValueError, match='invalid reply'):
+            run_program(socket_path, source='void main() {}')
+        thread.join()
+
+
+#-------------------------------------------------------------------------------
+# Batch runner tests
+#-------------------------------------------------------------------------------
+def test_batch_runs_programs_separately(tmp_path):
+    (tmp_path / 'echo.mypl').write_text('void main() {print("got " + input());}')
+    (tmp_path / 'echo.in').write_text('ann\n')
+    (tmp_path / 'bad.mypl').write_text('void main() {print(1/0);}')
+    programs = find_programs([str(tmp_path / '*.mypl'), str(tmp_path / 'missing.mypl')])
+    assert [os.path.basename(p) for p in programs] == ['bad.mypl', 'echo.mypl', 'missing.mypl']
+    report = run_batch(programs, workers=2, cache_dir=str(tmp_path / 'cache'))
+    bad, echo, missing = report['results']
+    assert echo['status'] == 0 and echo['stdout'] == 'got ann'
+    assert echo['stdin'] == str(tmp_path / 'echo.in')
+    assert bad['status'] == 1 and bad['stdout'].startswith('VM Error:')
+    assert missing['status'] == 1 and missing['stdout'].startswith('ERROR: Could not open file')
+    assert report['programs'] == 3 and report['failed'] == 2
+
+
+#-------------------------------------------------------------------------------
+# Embedding API tests
+#-------------------------------------------------------------------------------
+def test_compiled_program_runs_many_times():
+    program = compile('void main() {print("hi " + input());}')
+    assert program.run(stdin='ann\n') == 'hi ann'
+    out = io.StringIO()
+    assert program.run(io.StringIO('bob\n'), out) is None
+    assert out.getvalue() == 'hi bob'
+
+def test_compiled_program_errors_raise():
+    with pytest.raises(MyPLError) as e:
+        compile('void main() {int x = "a";}')
+    assert str(e.value).startswith('Static Error:')
+    with pytest.raises(MyPLError) as e:
+        compile('void main() {print(1/0);}').run()
+    assert str(e.value).startswith('VM Error:')
+
+def test_compile_leaves_no_global_state():
+    program = (
+        'struct Node {int val;}\n'
+        'void main() {\n'
+        '  array Node xs = new Node[3];\n'
+        '  print(length(xs));\n'
+        '}\n'
+    )
+    for _ in range(3):
+        assert compile(program).run() == '3'
+    assert 'length_Nodearray' not in BUILTINS
+
+def test_compiled_program_runs_in_threads():
+    program = compile(
+        'void main() {\n'
+        '  int n = stoi(input());\n'
+        '  int total = 0;\n'
+        '  for (int i = 1; i <= n; i = i + 1) {total = total + i;}\n'
+        '  print(total);\n'
+        '}\n'
+    )
+    results = {}
+    def worker(n):
+        results[n] = program.run(stdin=f'{n}\n')
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {n: str(n * (n + 1) // 2) for n in range(1, 9)}
+
+
+#-------------------------------------------------------------------------------
+# Builtin registry tests
+#-------------------------------------------------------------------------------
+def test_builtin_registry_ids():
+    assert BUILTINS['get_int_string'].params == (('int', False), ('string', False))
+    assert BUILTINS['length_intarray'].opcode == OpCode.LEN
+    assert fun_id('f', [('int', False), ('Node', True)]) == 'f_int_Nodearray'
+
+def test_builtin_calls_emit_opcodes():
+    program = (
+        'struct Node {int val;}\n'
+        'void main() {\n'
+        '  array Node xs = new Node[2];\n'
+        '  print(itos(length(xs)) + get(0, "ab"));\n'
+        '}\n'
+    )
+    vm = compile_source(program)
+    opcodes = [instr.opcode for instr in vm.frame_templates['main'].instructions]
+    assert OpCode.CALL not in opcodes
+    assert [OpCode.LEN, OpCode.TOSTR] == [op for op in opcodes if op in (OpCode.LEN, OpCode.TOSTR)]
+    assert OpCode.GETC in opcodes and OpCode.WRITE in opcodes
+
+def test_redefining_struct_length_builtin():
+    program = (
+        'struct Node {int val;}\n'
+        'int length(array Node xs) {return 0;}\n'
+        'void main() {}\n'
+    )
+    with pytest.raises(MyPLError) as e:
+        compile(program)
+    assert str(e.value).startswith('Static Error:')
+
+def test_print_call_used_as_value():
+    programs = [
+        'void main() {string s = print(1);}',
+        'void main() {int x = 0; x = print(1);}',
+        'int g() {return print(1);}\nvoid main() {print(g());}',
+    ]
+    for program in programs:
+        with pytest.raises(MyPLError) as e:
+            compile(program)
+        assert str(e.value).startswith('Static Error: void function call used as a value')
+    # user void functions return null
+    program = 'void f() {}\nvoid main() {f(); string s = f(); print(s);}'
+    assert compile(program).run() == 'null'
+
+#-------------------------------------------------------------------------------
+# Buffered output tests
+#-------------------------------------------------------------------------------
+def test_write_formats_by_type():
+    program = compile('void main() {print(true); print("True"); print(1.5); string s = null; print(s);}')
+    assert program.run() == 'trueTrue1.5null'
+
+def test_output_flushed_before_read_and_on_error():
+    class Input:
+        def __init__(self, out):
+            self.out = out
+            self.seen = None
+        def readline(self):
+            self.seen = self.out.getvalue()
+            return '0\n'
+    program = compile(
+        'void main() {\n'
+        '  print("n: ");\n'
+        '  int n = stoi(input());\n'
+        '  print("before");\n'
+        '  print(1 / n);\n'
+        '}\n'
+    )
+    out = io.StringIO()
+    stdin = Input(out)
+    with pytest.raises(MyPLError):
+        program.vm(stdin, out).run()
+    assert stdin.seen == 'n: '
+    assert out.getvalue() == 'n: before'
+
+def test_output_flushed_at_buffer_size():
+    program = compile_source('void main() {for (int i = 0; i < 10; i = i + 1) {print("ab");}}')
+    out = io.StringIO()
+    vm = VM(stdout=out, buffer_size=8)
+    vm.frame_templates = program.frame_templates
+    flushed = []
+    write = out.write
+    out.write = lambda text: flushed.append(text) or write(text)
+    vm.run()
+    assert flushed == ['abababab', 'abababab', 'abab']
+
+
+#-------------------------------------------------------------------------------
+# Input stream tests
+#-------------------------------------------------------------------------------
+def test_read_from_pluggable_stream():
+    class Lines:
+        def __init__(self, lines):
+            self.lines = iter(lines)
+        def readline(self):
+            return next(self.lines, '')
+    program = compile('void main() {print(input() + input());}')
+    assert program.run(Lines(['a\n', ' b \n'])) == 'ab'
+    with pytest.raises(EOFError):
+        program.run(Lines(['a\n']))
+
+def test_flush_before_read_from_file(tmp_path):
+    # a prompt is shown before each read even when the input isn't a
+    # terminal, since a parent process may be waiting for it
+    path = tmp_path / 'input.txt'
+    path.write_text('1\n2\n')
+    program = compile('void main() {print("a"); string x = input(); print(x); print(input());}')
+    out = io.StringIO()
+    flushes = []
+    out.flush = lambda: flushes.append(out.getvalue())
+    with open(path, 'r', encoding='utf-8') as stdin:
+        program.run(stdin, out)
+    assert out.getvalue() == 'a12'
+    assert flushes == ['a', 'a1', 'a12']
+
+def test_default_input_is_sys_stdin(monkeypatch):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('from stdin\n'))
+    out = io.StringIO()
+    compile('void main() {print(input());}').vm(stdout=out).run()
+    assert out.getvalue() == 'from stdin'
+
+
+#-------------------------------------------------------------------------------
+# Profiler tests
+#-------------------------------------------------------------------------------
+def test_profiler_counts_and_calls():
+    program = compile(
+        'int fac(int n) {\n'
+        '  if (n <= 1) {return 1;}\n'
+        '  return n * fac(n - 1);\n'
+        '}\n'
+        'void main() {print(fac(5));}\n'
+    )
+    ticks = iter(range(1000))
+    profiler = Profiler(clock=lambda: next(ticks))
+    out = io.StringIO()
+    program.vm(stdout=out).run(profiler=profiler)
+    assert out.getvalue() == '120'
+    fac = profiler.functions['fac_int']
+    main = profiler.functions['main']
+    assert fac.calls == 5 and main.calls == 1
+    assert profiler.opcode_counts()['CALL'] == 5
+    assert profiler.opcode_counts()['RET'] == 6  # including main's
+    assert fac.instructions + main.instructions == profiler.instruction_count()
+    # one tick per clock read: the outermost fac call starts at 2 and
+    # returns at 11, and recursive calls are only timed once
+    assert fac.cum_time == 9
+    assert fac.cum_time < main.cum_time < profiler.total_time
+    assert main.self_time + fac.self_time == main.cum_time
+    name, pc, instr, count = profiler.hot_instructions(1)[0]
+    assert name == 'fac_int' and count == 5
+    assert 'fac_int' in profiler.report()
+
+def test_profiler_stops_on_error():
+    program = compile('void main() {int x = 0; print(1 / x);}')
+    profiler = Profiler()
+    with pytest.raises(MyPLError):
+        program.vm(stdout=io.StringIO()).run(profiler=profiler)
+    assert profiler.functions['main'].calls == 1
+    assert not profiler.stack
+    assert profiler.opcode_counts()['DIV'] == 1
+
+
+#-------------------------------------------------------------------------------
+# Tracer tests
+#-------------------------------------------------------------------------------
+def test_tracer_hooks():
+    class Recorder(Tracer):
+        def __init__(self):
+            self.events = []
+        def call(self, frame):
+            self.events.append(('call', frame.template.function_name))
+        def ret(self, frame):
+            self.events.append(('ret', frame.template.function_name))
+        def alloc(self, frame, oid, kind, size):
+            self.events.append(('alloc', kind, size))
+    program = compile(
+        'struct P {int x;}\n'
+        'int f(int n) {return n + 1;}\n'
+        'void main() {P p = new P(f(1)); array int xs = new int[3];}\n'
+    )
+    tracer = Recorder()
+    program.vm().run(tracer=tracer)
+    assert tracer.events == [('call', 'main'), ('alloc', 'struct', 0),
+                             ('call', 'f_int'), ('ret', 'f_int'),
+                             ('alloc', 'array', 3), ('ret', 'main')]
+
+def test_json_tracer():
+    trace = io.StringIO()
+    program = compile('void main() {print(1 + 2);}')
+    assert program.run(stdout=None) == '3'
+    out = io.StringIO()
+    program.vm(stdout=out).run(tracer=JsonTracer(trace))
+    assert out.getvalue() == '3'
+    events = [json.loads(line) for line in trace.getvalue().splitlines()]
+    assert events[0] == ['c', 'main', 1]
+    assert events[1] == ['i', 'main', 0, 'PUSH', 1]
+    assert ['i', 'main', 2, 'ADD', None] in events
+    assert events[-1] == ['r', 'main', 0]
+
+def test_debug_tracer(capsys):
+    compile('void main() {print("hi");}').vm().run(debug=True)
+    out = capsys.readouterr().out
+    assert 'INSTRUCTION...: OpCode.WRITE()' in out
+    # program output is not buffered behind the trace
+    assert 'NEXT FUNCTION..: main\nhi\n' in out
+
+
+#-------------------------------------------------------------------------------
+# Sampling profiler tests
+#-------------------------------------------------------------------------------
+def test_sampler_output_formats():
+    main = VMFrameTemplate('main', 0)
+    f = VMFrameTemplate('f', 0)
+    vm = VM()
+    ticks = iter(range(100))
+    sampler = Sampler(vm, clock=lambda: next(ticks))
+    sampler.start_time = 0
+    for stack in [[(main, 3)], [(main, 5), (f, 2)], [(main, 5), (f, 4)], [(main, 6)]]:
+        vm.call_stack = [VMFrame(template, pc) for template, pc in stack]
+        sampler.sample()
+    sampler.stop_time = 10
+    assert sampler.collapsed() == 'main 2\nmain;f 2\n'
+    assert sampler.collapsed(offsets=True) == 'main:2 1\nmain:4;f:1 1\nmain:4;f:3 1\nmain:5 1\n'
+    events = [(e['ph'], e['name'], e['ts']) for e in sampler.chrome_trace()['traceEvents']]
+    assert events == [('B', 'main', 0), ('B', 'f', 1e6), ('E', 'f', 3e6), ('E', 'main', 1e7)]
+
+def test_sampler_runs_alongside_program():
+    program = compile_source(
+        'void main() {\n'
+        '  int total = 0;\n'
+        '  for (int i = 0; i < 3000; i = i + 1) {total = total + i;}\n'
+        '  print(total);\n'
+        '}\n'
+    )
+    out = io.StringIO()
+    program.stdout = out
+    with Sampler(program, interval=0.0001) as sampler:
+        program.run()
+    assert out.getvalue() == '4498500'
+    assert all(stack[0][0].function_name == 'main' for _, stack in sampler.samples)
+    assert sampler.thread is None
+
+
+#-------------------------------------------------------------------------------
+# Line table tests
+#-------------------------------------------------------------------------------
+def test_line_table_positions():
+    program = (
+        'void main() {\n'
+        '  int x = 1;\n'
+        '  x = x +\n'
+        '      2;\n'
+        '}\n'
+    )
+    template = compile_source(program).frame_templates['main']
+    instrs = template.instructions
+    pcs = [pc for pc in range(len(instrs)) if instrs[pc].opcode == OpCode.ADD]
+    assert template.position(pcs[0]) == (3, 9)
+    assert template.position(0) == (2, 11)
+    # entries are only added when the position changes
+    assert len(template.line_table) < len(instrs)
+    assert VMFrameTemplate('f', 0).position(0) is None
+
+def test_vm_error_reports_source_line():
+    program = compile(
+        'void main() {\n'
+        '  int x = 0;\n'
+        '  print(10 / x);\n'
+        '}\n'
+    )
+    with pytest.raises(MyPLError) as e:
+        program.run()
+    assert 'near line 3, column 12' in str(e.value)
+
+def test_profile_and_samples_by_line():
+    program = compile_source(
+        'void main() {\n'
+        '  int total = 0;\n'
+        '  for (int i = 0; i < 5; i = i + 1) {\n'
+        '    total = total + i;\n'
+        '  }\n'
+        '}\n'
+    )
+    profiler = Profiler()
+    program.run(profiler=profiler)
+    counts = profiler.line_counts()
+    assert counts[('main', 4)] == 5 * 4
+    sampler = Sampler(program)
+    sampler.start_time = 0
+    template = program.frame_templates['main']
+    program.call_stack = [VMFrame(template, 1)]
+    sampler.sample()
+    assert sampler.collapsed(lines=True) == 'main (line 2) 1\n'
+
+
+#-------------------------------------------------------------------------------
+# Phase timing tests
+#-------------------------------------------------------------------------------
+def test_phase_timings(capsys):
+    program = (
+        'int sq(int x) {return x * x;}\n'
+        'void main() {\n'
+        '  print(sq(3) + sq(4));\n'
+        '}\n'
+    )
+    ticks = iter(range(100))
+    timings = PhaseTimings(clock=lambda: next(ticks))
+    run_timed(program, timings)
+    assert capsys.readouterr().out == '25'
+    names = [name for name, _, _ in timings.phases]
+    assert names == ['lex', 'parse', 'check', 'prune', 'purity', 'codegen', 'execute']
+    assert all(seconds == 1 for _, seconds, _ in timings.phases)
+    assert all(peak >= 0 for _, _, peak in timings.phases)
+    assert timings.counts['tokens'] == 33
+    assert timings.counts['functions'] == 2
+    assert timings.counts['functions dropped'] == 0
+    assert timings.counts['pure functions'] == 1
+    assert timings.counts['instructions'] == 13
+    assert timings.counts['max stack depth'] == 2
+    assert 'execute' in timings.report()
+
+def test_count_nodes_and_stack_depth():
+    ast = ASTParser(Lexer(FileWrapper(io.StringIO(
+        'void main() {int x = 1 + 2;}'
+    )))).parse()
+    # Program, FunDef, DataType, VarDecl, VarDef, DataType, Expr,
+    # SimpleTerm, SimpleRValue, Expr, SimpleTerm, SimpleRValue
+    assert count_nodes(ast) == 12
+    template = VMFrameTemplate('f', 1, [
+        VMInstr(OpCode.STORE, 0), VMInstr(OpCode.LOAD, 0), VMInstr(OpCode.JMPF, 6),
+        VMInstr(OpCode.LOAD, 0), VMInstr(OpCode.DUP), VMInstr(OpCode.RET),
+        VMInstr(OpCode.PUSH, 0), VMInstr(OpCode.RET),
+    ])
+    assert max_stack_depth(template, {}) == 2
+
+
+#-------------------------------------------------------------------------------
+# Run metrics tests
+#-------------------------------------------------------------------------------
+def test_vm_metrics_counts(capsys):
+    program = compile_source(
+        'struct P {int x;}\n'
+        'int f(int n) {\n'
+        '  if (n == 0) {return 0;}\n'
+        '  return f(n - 1);\n'
+        '}\n'
+        'void main() {\n'
+        '  array int xs = new int[4];\n'
+        '  for (int i = 0; i < 3; i = i + 1) {\n'
+        '    P p = new P(i);\n'
+        '  }\n'
+        '  print(f(5));\n'
+        '}\n'
+    )
+    profiler = Profiler()
+    program.run(profiler=profiler)
+    metrics = program.metrics()
+    assert metrics['instructions'] == profiler.instruction_count()
+    assert metrics['calls'] == 6
+    assert metrics['max_call_depth'] == 7
+    assert metrics['structs_allocated'] == 3
+    assert metrics['arrays_allocated'] == 1
+    assert metrics['heap_objects'] == 4
+    assert metrics['heap_array_elements'] == 4
+
+def test_vm_metrics_count_failed_run():
+    program = compile('void main() {\n  int x = 0;\n  print(1 / x);\n}\n').vm()
+    with pytest.raises(MyPLError):
+        program.run()
+    # PUSH, STORE, PUSH, LOAD, DIV
+    assert program.metrics()['instructions'] == 5
+
+def test_write_metrics_formats(tmp_path):
+    vm = compile_source('void main() {int x = 1;}')
+    vm.run()
+    metrics = run_metrics(vm, [('lex', 0.5, 0)], 0.25, 0)
+    path = tmp_path / 'run.json'
+    write_metrics(str(path), metrics)
+    data = json.loads(path.read_text())
+    assert data['instructions'] == 4
+    assert data['phase_seconds'] == {'lex': 0.5}
+    assert data['exit_status'] == 0
+    text = prometheus(metrics)
+    assert 'mypl_instructions_total 4\n' in text
+    assert '# TYPE mypl_max_call_depth gauge\n' in text
+    assert 'mypl_phase_seconds{phase="lex"} 0.5\n' in text
+    assert os.listdir(tmp_path) == ['run.json']
+
+
+#-------------------------------------------------------------------------------
+# Sandbox limit tests
+#-------------------------------------------------------------------------------
+def test_instruction_limit_stops_infinite_loop():
+    program = compile('void main() {\n  int i = 0;\n  while (true) {i = i + 1;}\n}\n')
+    with pytest.raises(MyPLError) as e:
+        program.run(limits={'max_instructions': 50000})
+    assert 'instruction limit exceeded' in str(e.value)
+    assert 'call depth 1' in str(e.value)
+
+def test_limit_error_names_the_jump():
+    program = compile('void main() {\n  int i = 0;\n  while (true) {i = i + 1;}\n}\n')
+    for limits in ({'max_instructions': 50000}, {'timeout': 0.05}):
+        with pytest.raises(MyPLError) as e:
+            program.run(limits=limits)
+        assert re.search(r'at \d+: OpCode.JMP\(\d+\)\)$', str(e.value))
+
+def test_call_depth_limit_stops_recursion():
+    vm = compile('int f(int n) {return f(n + 1);}\nvoid main() {print(f(0));}\n').vm()
+    vm.set_limits(max_call_depth=20)
+    with pytest.raises(MyPLError) as e:
+        vm.run()
+    assert 'call depth limit exceeded' in str(e.value)
+    assert len(vm.call_stack) == 21
+
+def test_heap_limit_counts_array_elements():
+    program = compile('void main() {\n  array int xs = new int[100];\n}\n')
+    assert program.run(limits={'max_heap_objects': 101}) == ''
+    with pytest.raises(MyPLError) as e:
+        program.run(limits={'max_heap_objects': 100})
+    assert 'heap limit exceeded' in str(e.value)
+
+def test_timeout_stops_infinite_loop():
+    program = compile('void main() {\n  while (true) {}\n}\n')
+    with pytest.raises(MyPLError) as e:
+        program.run(limits={'timeout': 0.05})
+    assert 'time limit exceeded' in str(e.value)
+
+def test_no_limits_uses_plain_handlers():
+    vm = compile('void main() {print(1);}').vm(stdout=io.StringIO())
+    assert vm.handlers is HANDLERS
+    vm.set_limits(max_call_depth=5)
+    assert vm.handlers is LIMITED_HANDLERS
+    vm.set_limits()
+    assert vm.handlers is HANDLERS
+
+
+#-------------------------------------------------------------------------------
+# Dead function elimination tests
+#-------------------------------------------------------------------------------
+def checked_ast(program):
+    ast = ASTParser(Lexer(FileWrapper(io.StringIO(program)))).parse()
+    ast.accept(SemanticChecker())
+    return ast
+
+def test_call_graph_reachability():
+    ast = checked_ast(
+        'int f(int x) {return g(x) + 1;}\n'
+        'int g(int x) {return x;}\n'
+        'int g(string x) {return length(x);}\n'
+        'int h(int x) {return f(x);}\n'
+        'void main() {\n'
+        '  array int xs = new int[f(1)];\n'
+        '  print(xs[g(0)]);\n'
+        '}\n'
+    )
+    graph = CallGraph()
+    ast.accept(graph)
+    assert graph.calls['main'] == {'f_int', 'g_int'}
+    assert graph.calls['f_int'] == {'g_int'}
+    assert graph.calls['g_string'] == set()
+    assert graph.reachable() == {'main', 'f_int', 'g_int'}
+
+def test_unreachable_functions_dropped(capsys):
+    ast = checked_ast(
+        'int f(int x) {return f(x);}\n'
+        'int g(int x) {return f(x);}\n'
+        'int sq(int x) {return x * x;}\n'
+        'void main() {print(sq(3));}\n'
+    )
+    assert eliminate_dead_functions(ast) == 2
+    assert [f.fun_id for f in ast.fun_defs] == ['sq_int', 'main']
+    vm = VM()
+    ast.accept(CodeGenerator(vm))
+    assert set(vm.frame_templates) == {'sq_int', 'main'}
+    vm.run()
+    assert capsys.readouterr().out == '9'
+
+def test_ir_reports_dropped_functions():
+    bin_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, 'mypl', '--ir'], cwd=bin_dir,
+                            input='int f() {return 1;}\nvoid main() {print(2);}\n',
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.startswith('\nFrame main\n')
+    assert 'Frame f' not in result.stdout
+    assert result.stdout.endswith('\n(1 unreachable functions dropped)\n')
+
+def test_unreachable_functions_still_checked():
+    with pytest.raises(MyPLError):
+        compile('int f(int x) {return true;}\nvoid main() {}\n')
+
+
+#-------------------------------------------------------------------------------
+# Lazy compilation tests
+#-------------------------------------------------------------------------------
+def test_lazy_code_generated_on_first_call():
+    program = compile(
+        'int sq(int x) {return x * x;}\n'
+        'int unused(int x) {return x;}\n'
+        'void main() {print(sq(3));}\n',
+        lazy=True
+    )
+    templates = program.frame_templates
+    assert all(t.generate is not None and t.instructions == [] for t in templates.values())
+    assert program.run() == '9'
+    assert templates['sq_int'].generate is None
+    assert templates['sq_int'].instructions == [STORE(0), LOAD(0), LOAD(0), MUL(), RET()]
+    assert templates['unused_int'].generate is not None
+    # later runs reuse the generated code
+    assert program.run() == '9'
+
+def test_lazy_matches_eager_output():
+    source = (
+        'struct Node {int val; Node next;}\n'
+        'int total(Node n) {\n'
+        '  if (n == null) {return 0;}\n'
+        '  return n.val + total(n.next);\n'
+        '}\n'
+        'void main() {\n'
+        '  Node n = null;\n'
+        '  for (int i = 0; i < 5; i = i + 1) {n = new Node(i, n);}\n'
+        '  print(total(n));\n'
+        '}\n'
+    )
+    assert compile(source, lazy=True).run() == compile(source).run() == '10'
+
+def test_lazy_memoize_needs_eager_check():
+    bin_dir = os.path.dirname(os.path.abspath(__file__))
+    def run(*flags):
+        return subprocess.run([sys.executable, 'mypl', *flags], cwd=bin_dir,
+                              input='void main() {print(1);}', capture_output=True, text=True)
+    result = run('--lazy', '--memoize')
+    assert result.returncode == 2
+    assert '--memoize with --lazy requires --eager-check' in result.stderr
+    assert run('--lazy', '--eager-check', '--memoize').stdout == '1'
+
+def test_lazy_static_errors_on_first_call():
+    source = (
+        'int bad(int x) {return true;}\n'
+        'void main() {\n'
+        '  print("ok");\n'
+        '  if (false) {print(bad(1));}\n'
+        '}\n'
+    )
+    assert compile(source, lazy=True).run() == 'ok'
+    with pytest.raises(MyPLError):
+        compile(source, lazy=True, eager_check=True)
+    program = compile(source.replace('false', 'true'), lazy=True)
+    with pytest.raises(MyPLError) as e:
+        program.run()
+    assert 'return type does not match' in str(e.value)
+
+
+#-------------------------------------------------------------------------------
+# Inlining tests
+#-------------------------------------------------------------------------------
+def test_small_function_inlined():
+    source = (
+        'void swap(array int xs, int i, int j) {\n'
+        '  int tmp = xs[i];\n'
+        '  xs[i] = xs[j];\n'
+        '  xs[j] = tmp;\n'
+        '}\n'
+        'void main() {\n'
+        '  array int xs = new int[3];\n'
+        '  xs[0] = 1;\n'
+        '  xs[2] = 3;\n'
+        '  swap(xs, 0, 2);\n'
+        '  print(xs[0]);\n'
+        '  print(xs[2]);\n'
+        '}\n'
+    )
+    program = compile(source, opt_level=1)
+    assert list(program.frame_templates) == ['main']
+    instrs = program.frame_templates['main'].instructions
+    assert not any(instr.opcode == OpCode.CALL for instr in instrs)
+    assert program.run() == compile(source).run() == '31'
+
+def test_inlined_slots_above_defined_variables():
+    # x's slot (1) only exists at the calls if the if body ran, so the
+    # inlined variables must start at it (not past it)
+    source = (
+        'int add(int a, int b) {\n'
+        '  int c = a + b;\n'
+        '  return c;\n'
+        '}\n'
+        'void main() {\n'
+        '  int y = 5;\n'
+        '  if (y < 1) {int x = 10;}\n'
+        '  print(add(y, 2));\n'
+        '  int z = add(y, y);\n'
+        '  print(z);\n'
+        '}\n'
+    )
+    assert compile(source, opt_level=1).run() == '710'
+
+def test_inlining_skips_timings_module():
+    code = (
+        'import sys\n'
+        'from mpl.mypl_compiler import compile\n'
+        'compile("int f(int x) {return x;} void main() {print(f(1));}", opt_level=2)\n'
+        'print("mpl.mypl_timings" in sys.modules)\n'
+    )
+    bin_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, '-c', code], cwd=bin_dir,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout == 'False\n'
+
+def test_function_leaving_values_not_inlined():
+    # builtins called as statements leave their results on the stack
+    source = (
+        'int f(int y) {length("abc"); return y;}\n'
+        'int g(int y) {input(); return y;}\n'
+        'void main() {print(10 + f(5)); print(g(3));}\n'
+    )
+    program = compile(source, opt_level=1)
+    assert set(program.frame_templates) == {'main', 'f_int', 'g_int'}
+    assert program.run(stdin='x\n') == compile(source).run(stdin='x\n') == '153'
+
+def test_inlined_early_return():
+    source = (
+        'int clamp(int x) {\n'
+        '  if (x > 10) {return 10;}\n'
+        '  return x;\n'
+        '}\n'
+        'void main() {\n'
+        '  for (int i = 8; i < 13; i = i + 2) {print(clamp(i));}\n'
+        '}\n'
+    )
+    program = compile(source, opt_level=1)
+    assert list(program.frame_templates) == ['main']
+    assert program.run() == '81010'
+
+def test_recursive_and_large_functions_not_inlined():
+    source = (
+        'int fac(int n) {\n'
+        '  if (n < 2) {return 1;}\n'
+        '  return n * fac(n - 1);\n'
+        '}\n'
+        'void main() {print(fac(5));}\n'
+    )
+    program = compile(source, opt_level=2)
+    assert set(program.frame_templates) == {'fac_int', 'main'}
+    assert program.run() == '120'
+    assert not inlinable(program.frame_templates['fac_int'], INLINE_SIZES[2])
+    assert compile(source, opt_level=0).frame_templates['fac_int'].instructions == \
+        program.frame_templates['fac_int'].instructions
+
+
+#-------------------------------------------------------------------------------
+# Link tests
+#-------------------------------------------------------------------------------
+def test_link_resolves_call_targets():
+    vm = compile_source('int f(int x) {return x;}\nvoid main() {print(f(1));}\n')
+    assert vm.linked
+    call = [i for i in vm.frame_templates['main'].instructions if i.opcode == OpCode.CALL][0]
+    assert call.target is vm.frame_templates['f_int']
+    # the target isn't part of an instruction's value
+    assert call == CALL('f_int')
+
+def test_unresolved_call_is_load_error():
+    out = io.StringIO()
+    vm = VM(stdout=out)
+    main = VMFrameTemplate('main', 0, [PUSH('hi'), WRITE(), CALL('g'), RET()])
+    vm.add_frame_template(main)
+    assert not vm.linked
+    with pytest.raises(MyPLError) as e:
+        vm.run()
+    assert 'No "g" function' in str(e.value)
+    assert '(in main at 2: OpCode.CALL(g))' in str(e.value)
+    # nothing ran
+    assert out.getvalue() == ''
+
+def test_lazy_generated_calls_linked():
+    program = compile(
+        'int g(int x) {return x + 1;}\n'
+        'int f(int x) {return g(x) * 2;}\n'
+        'void main() {print(f(1));}\n',
+        lazy=True
+    )
+    assert program.run() == '4'
+    call = [i for i in program.frame_templates['f_int'].instructions
+            if i.opcode == OpCode.CALL][0]
+    assert call.target is program.frame_templates['g_int']
+
+
+#-------------------------------------------------------------------------------
+# Purity and memoization tests
+#-------------------------------------------------------------------------------
+def test_pure_functions_marked():
+    ast = checked_ast(
+        'struct P {int x;}\n'
+        'int fib(int n) {\n'
+        '  if (n < 2) {return n;}\n'
+        '  return fib(n - 1) + fib(n - 2);\n'
+        '}\n'
+        'string label(int n) {return "n" + itos(fib(n));}\n'
+        'int shout(int n) {print(n); return n;}\n'
+        'int calls_shout(int n) {return shout(n) + 1;}\n'
+        'int sum(array int xs) {return length(xs);}\n'
+        'int make(int n) {P p = new P(n); return p.x;}\n'
+        'P wrap(int n) {return null;}\n'
+        'void main() {}\n'
+    )
+    assert mark_pure_functions(ast) == 2
+    assert {f.fun_id for f in ast.fun_defs if f.pure} == {'fib_int', 'label_int'}
+
+def test_memoized_calls_skip_pure_functions():
+    source = (
+        'int fib(int n) {\n'
+        '  if (n < 2) {return n;}\n'
+        '  return fib(n - 1) + fib(n - 2);\n'
+        '}\n'
+        'void main() {print(fib(20));}\n'
+    )
+    program = compile(source)
+    assert program.frame_templates['fib_int'].pure
+    plain = program.vm(stdout=io.StringIO())
+    plain.run()
+    memo = program.vm(stdout=io.StringIO())
+    memo.set_memoize()
+    memo.run()
+    assert memo.stdout.getvalue() == plain.stdout.getvalue() == '6765'
+    metrics = memo.metrics()
+    assert metrics['memo_misses'] == 21
+    assert metrics['memo_hits'] == 18
+    assert metrics['calls'] == 21 < plain.metrics()['calls']
+    assert 'memo_hits' not in plain.metrics()
+
+def test_memoize_skips_impure_and_evicts():
+    source = (
+        'int sq(int x) {return x * x;}\n'
+        'int shout(int x) {print(x); return x;}\n'
+        'void main() {\n'
+        '  for (int i = 0; i < 3; i = i + 1) {\n'
+        '    print(sq(1) + sq(2) + sq(3) + shout(0));\n'
+        '  }\n'
+        '}\n'
+    )
+    vm = compile(source).vm(stdout=io.StringIO())
+    vm.set_memoize(2)
+    vm.run()
+    assert vm.stdout.getvalue() == '014014014'
+    # the three sq results don't fit in two entries
+    assert vm.metrics()['memo_hits'] == 0
+    assert len(vm.memo) == 2
+    vm = compile(source).vm(stdout=io.StringIO())
+    vm.set_memoize(3)
+    vm.run()
+    assert vm.metrics()['memo_hits'] == 6
+    assert vm.metrics()['calls'] == 6
+
+def test_compiler_version_tracks_sources(tmp_path):
+    import mpl.mypl_cache
+    version = compiler_version()
+    # a copy of the package with one source changed hashes differently
+    package_dir = os.path.dirname(mpl.mypl_cache.__file__)
+    for name in os.listdir(package_dir):
+        if name.endswith('.py'):
+            with open(os.path.join(package_dir, name), 'rb') as f:
+                (tmp_path / name).write_bytes(f.read())
+    assert source_hash(str(tmp_path)) == version
+    with open(tmp_path / 'mypl_code_gen.py', 'a') as f:
+        f.write('\n# changed\n')
+    assert source_hash(str(tmp_path)) != version